@@ -0,0 +1,176 @@
+# Async blockchain packages
+import asyncio
+import threading
+import contextvars
+import aiohttp
+from provider_pool import ProviderPool, is_unknown_block
+
+
+# 目前 run() 呼叫的 RPC 計數（gather 產生的子 task 會沿用同一個 context）
+_rpc_counter = contextvars.ContextVar("rpc_counter", default=None)
+
+
+class AsyncBlockchain:
+
+    # 初始化 - 在獨立執行緒中執行 event loop，所有 request 共用同一個 keep-alive 連線池
+    # ABI 編碼、合約實例與唯讀快取沿用同步版 Blockchain
+    def __init__(self, blockchain, endpoint_uri: str = None, pool_size: int = 100, timeout: float = 10.0):
+        self.blockchain = blockchain
+        self.endpoint_uri = endpoint_uri
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = None
+        self.request_id = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    # 由同步程式（Flask view）執行 coroutine 並等待結果
+    # 呼叫端執行緒會一直等到結果回來（Flask worker 仍被佔用）；好處是共用連線池，並讓同一個 request 內的查詢合併或並行
+    # 期間送出的 RPC 次數計入呼叫端執行緒，讓每個 request 的 RPC 統計包含非同步查詢
+    def run(self, coro):
+        counter = [0]
+
+        async def counted():
+            _rpc_counter.set(counter)
+            return await coro
+        try:
+            return asyncio.run_coroutine_threadsafe(counted(), self.loop).result(self.timeout)
+        finally:
+            self.blockchain.add_thread_rpc_count(counter[0])
+
+    # 關閉連線池與 event loop
+    def close(self):
+        if self.session is not None:
+            self.run(self.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _get_session(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+    # 送出 JSON-RPC 請求（payload 為 list 時即為 batch）
+    async def _post(self, payload):
+        session = await self._get_session()
+        # 全域統計沿用同步版的計數；單次 request 的次數由 run() 計入呼叫端執行緒
+        self.blockchain.count_rpc("batch" if isinstance(payload, list) else payload["method"])
+        counter = _rpc_counter.get()
+        if counter is not None:
+            counter[0] += 1
+        last_error = None
+        last_response = None
+        for endpoint_uri in self._get_endpoint_uris():
+            try:
+                async with session.post(endpoint_uri, json=payload) as response:
+                    response.raise_for_status()
+                    result = await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                last_error = exc
+                continue
+            if not is_unknown_block(result):
+                return result
+            last_response = result
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+    # 依序嘗試的節點網址：未指定節點時使用 provider pool 的讀取順序（與同步版相同的 failover），
+    # 一般 provider 只有單一網址
+    def _get_endpoint_uris(self):
+        if self.endpoint_uri:
+            return [self.endpoint_uri]
+        provider = self.blockchain.w3.provider
+        if isinstance(provider, ProviderPool):
+            return [node.url for node in provider.read_nodes()]
+        return [provider.endpoint_uri]
+
+    # 送出單一 JSON-RPC 請求並回傳 result
+    async def request(self, method: str, params: list):
+        self.request_id += 1
+        response = await self._post({"jsonrpc": "2.0", "id": self.request_id,
+                                     "method": method, "params": params})
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response["result"]
+
+    # 取得最新區塊高度（與同步版共用 block_number_ttl 內的快取值）
+    async def get_block_number(self):
+        block_number = self.blockchain.get_cached_block_number()
+        if block_number is None:
+            block_number = int(await self.request("eth_blockNumber", []), 16)
+            self.blockchain.set_block_number(block_number)
+        return block_number
+
+    # 唯讀呼叫（與同步版共用以區塊高度為 key 的快取）
+    async def call(self, contract_address: str, fn_name: str, args: tuple = ()):
+        return (await self.batch_call([(contract_address, fn_name, args)]))[0]
+
+    # 將多個唯讀呼叫合併成 JSON-RPC batch，已快取的呼叫不會再送出
+    # 編碼、解碼與快取與同步版共用（Blockchain.prepare_calls / decode_calls），raise_errors 與 block_number 的意義相同
+    async def batch_call(self, calls: list, raise_errors: bool = True, block_number: int = None):
+        if not calls:
+            return []
+        if block_number is None:
+            block_number = await self.get_block_number()
+        results, payload, pending = self.blockchain.prepare_calls(calls, block_number)
+        if payload:
+            self.blockchain.decode_calls(results, pending, await self.batch_request(payload), raise_errors)
+        return results
+
+    # 送出 JSON-RPC batch（超過 max_batch_size 時拆成多段同時送出），回傳依 id 索引的結果
+    async def batch_request(self, payload: list):
+        size = self.blockchain.max_batch_size
+        chunks = [payload[start:start + size] for start in range(0, len(payload), size)]
+        responses = dict()
+        for response_list in await asyncio.gather(*[self._post(chunk) for chunk in chunks]):
+            responses.update({each["id"]: each for each in response_list})
+        return responses
+
+    # 批次查詢多個合約的完整成績單（步驟與同步版共用 Blockchain.plan_transcripts）
+    async def get_transcripts(self, contract_addresses: list, block_number: int = None):
+        if block_number is None:
+            block_number = await self.get_block_number()
+        plan = self.blockchain.plan_transcripts(contract_addresses)
+        try:
+            calls = next(plan)
+            while True:
+                calls = plan.send(await self.batch_call(calls, raise_errors=False, block_number=block_number))
+        except StopIteration as stop:
+            return stop.value
+
+    # 查詢某合約中存放的課程數量
+    async def get_course_count(self, contract_address: str):
+        return await self.call(contract_address, "getCourseCount")
+
+    # 查詢某 index 位置的課程資訊
+    async def get_course(self, contract_address: str, index: int):
+        return await self.call(contract_address, "getCourse", (index, ))
+
+    # 一次取得某合約中的所有課程資訊
+    async def get_courses(self, contract_address: str):
+        course_count = await self.get_course_count(contract_address)
+        calls = [(contract_address, "getCourse", (i, )) for i in range(course_count)]
+        return [list(course_info) for course_info in await self.batch_call(calls)]
+
+    # 檢查該學生是否滿足畢業條件
+    async def check_finish_certificate(self, contract_address: str):
+        return await self.call(contract_address, "checkFinishCertificate")
+
+    # 查看目前學籍狀態
+    async def get_education_status(self, contract_address: str):
+        return await self.call(contract_address, "getEducationStatus")
+
+    # 以一次 JSON-RPC batch 查詢學籍狀態與畢業條件
+    async def get_certificate_status(self, contract_address: str):
+        education_status, check_finish = await self.batch_call([
+            (contract_address, "getEducationStatus", ()),
+            (contract_address, "checkFinishCertificate", ())])
+        return education_status, check_finish
+
+    # 同時查詢多個合約的課程紀錄
+    async def get_courses_many(self, contract_addresses: list):
+        return await asyncio.gather(*[self.get_courses(contract_address)
+                                      for contract_address in contract_addresses])
@@ -0,0 +1,164 @@
+# Async server packages
+import time
+import hashlib
+import json
+import asyncio
+from aiohttp import web
+
+
+# 公開驗證 API 單次最多查詢的合約數
+MAX_VERIFY_ADDRESSES = 5000
+
+
+# 檢查 /verify/ 查詢的合約地址列表，格式錯誤時回傳錯誤訊息（Flask 與 aiohttp 版本共用）
+def check_verify_addresses(contract_addresses):
+    if not contract_addresses or not isinstance(contract_addresses, list):
+        return "缺少合約地址!"
+    if not all(isinstance(address, str) for address in contract_addresses):
+        return "合約地址格式錯誤!"
+    if len(contract_addresses) > MAX_VERIFY_ADDRESSES:
+        return "一次最多查詢 " + str(MAX_VERIFY_ADDRESSES) + " 個合約!"
+    return None
+
+
+# 由 POST body 取得合約地址列表（body 不是 JSON object 時視為沒有地址）
+def get_posted_addresses(body):
+    return body.get("addresses", list()) if isinstance(body, dict) else list()
+
+
+# ETag 以區塊高度與查詢的合約地址計算，區塊未前進時可回傳 304
+def get_verify_etag(block_number: int, contract_addresses: list):
+    return hashlib.sha1((str(block_number) + ":" + ",".join(contract_addresses)).encode()).hexdigest()
+
+
+# If-None-Match 是否包含該 ETag（接受 weak ETag 與 *）
+def etag_matches(header: str, etag: str):
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag.strip('"') == etag:
+            return True
+    return False
+
+
+class AsyncServer:
+
+    # 初始化 - 以 aiohttp 在 AsyncBlockchain 的 event loop 上提供需要大量鏈上查詢的公開 API
+    # 與 Flask 在同一個 process（共用快取、收據追蹤與索引器），每個 request 是一個 coroutine，
+    # 等待節點回應時不佔用執行緒，單一 event loop 即可同時處理大量 request
+    def __init__(self, async_blockchain, metrics=None, host: str = "0.0.0.0", port: int = 5001):
+        self.async_blockchain = async_blockchain
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.runner = None
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.router.add_route("GET", "/verify/", self.verify)
+        self.app.router.add_route("POST", "/verify/", self.verify)
+        self.app.router.add_route("GET", "/verify/{contract_address}/", self.verify)
+        self.app.router.add_route("GET", "/tx/{tx_hash}/", self.transaction_status)
+        self.app.router.add_route("GET", "/tx/{tx_hash}/stream/", self.transaction_status_stream)
+
+    # 啟動伺服器（在 event loop 執行緒上監聽，呼叫端不需等待）
+    def start(self):
+        if self.runner is not None:
+            return
+
+        async def setup():
+            runner = web.AppRunner(self.app)
+            await runner.setup()
+            # 多個 worker process 可共用同一個 port
+            await web.TCPSite(runner, self.host, self.port, reuse_port=True).start()
+            return runner
+        self.runner = asyncio.run_coroutine_threadsafe(setup(), self.async_blockchain.loop).result()
+
+    # 停止伺服器
+    def stop(self):
+        if self.runner is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.async_blockchain.loop).result()
+        self.runner = None
+
+    # 記錄每個 route 的延遲（與 Flask 相同的指標名稱），公開 API 允許跨來源讀取
+    @web.middleware
+    async def _middleware(self, request, handler):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status
+            if not response.prepared:
+                response.headers["Access-Control-Allow-Origin"] = "*"
+            return response
+        except web.HTTPException as exc:
+            status = exc.status
+            raise
+        finally:
+            if self.metrics is not None:
+                resource = request.match_info.route.resource
+                route = resource.canonical if resource is not None else "unmatched"
+                self.metrics.observe("http_request_duration_seconds",
+                                     {"route": route, "method": request.method, "status": str(status)},
+                                     time.perf_counter() - start)
+
+    # 公開驗證 API - 查詢一或多個合約的個人資料、修課紀錄、學籍狀態與畢業資格
+    # GET /verify/<address>/、GET /verify/?address=...&address=...、POST /verify/ {"addresses": [...]}
+    async def verify(self, request):
+        contract_address = request.match_info.get("contract_address")
+        if contract_address:
+            contract_addresses = [contract_address]
+        elif request.method == "POST":
+            try:
+                contract_addresses = get_posted_addresses(await request.json())
+            except ValueError:
+                contract_addresses = list()
+        else:
+            contract_addresses = request.query.getall("address", list())
+        error = check_verify_addresses(contract_addresses)
+        if error:
+            return web.json_response({"err_msg": error}, status=400)
+        block_number = await self.async_blockchain.get_block_number()
+        etag = get_verify_etag(block_number, contract_addresses)
+        headers = {"ETag": '"' + etag + '"', "Cache-Control": "public, no-cache"}
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return web.Response(status=304, headers=headers)
+        # ETag、回應中的 block_number 與所有讀取都使用同一個區塊
+        transcripts = await self.async_blockchain.get_transcripts(contract_addresses, block_number)
+        body = {"block_number": block_number, "results": transcripts} if not contract_address else \
+            dict(transcripts[0], block_number=block_number)
+        return web.json_response(body, headers=headers)
+
+    # 交易狀態查詢（receipt tracker 的紀錄，包含上鏈後處理失敗時的 callback_error）
+    async def transaction_status(self, request):
+        record = self.async_blockchain.blockchain.get_transaction_status(request.match_info["tx_hash"])
+        if record is None:
+            return web.json_response({"err_msg": "查無此交易!"}, status=404)
+        return web.json_response(record)
+
+    # 交易狀態 - server-sent events，狀態改變時推送，交易完成後結束
+    # 每個連線只是一個等待中的 coroutine，不佔用執行緒
+    async def transaction_status_stream(self, request):
+        tx_hash = request.match_info["tx_hash"]
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream",
+                                               "Cache-Control": "no-cache",
+                                               "Access-Control-Allow-Origin": "*"})
+        await response.prepare(request)
+        last_status = None
+        while True:
+            record = self.async_blockchain.blockchain.get_transaction_status(tx_hash)
+            if record is None:
+                await response.write(b"event: error\ndata: {}\n\n")
+                break
+            if record["status"] != last_status:
+                last_status = record["status"]
+                await response.write(("data: " + json.dumps(record) + "\n\n").encode())
+            else:
+                await response.write(b": keep-alive\n\n")
+            if record["status"] != "pending":
+                break
+            await asyncio.sleep(1)
+        await response.write_eof()
+        return response
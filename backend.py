@@ -1,31 +1,66 @@
 # Flask API packages
+import os
+import json
+import time
 import yaml
-import pymysql
-from flask_mysqldb import MySQL
-from flask import Flask, render_template, request, jsonify, session, redirect
+from urllib.parse import urlencode, urlsplit
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, stream_with_context
 from blockchain import Blockchain
+from database import ConnectionPool, StudentDirectory, CredentialStore, PendingDeployStore
+from async_blockchain import AsyncBlockchain
+from async_server import AsyncServer, check_verify_addresses, get_posted_addresses, get_verify_etag
+from bulk_upload import JobRegistry, parse_records, ROSTER_FIELDS
+from indexer import (EventIndexer, get_indexed_courses, get_indexed_education_status, get_indexed_eligibility,
+                     is_indexer_fallback)
+from metrics import Metrics, cache_samples
+from provider_pool import ProviderPool
 
 
 app = Flask(__name__)
 
+# 效能指標（/metrics），request 帶有 X-Profile header 時回傳 Server-Timing
+metrics = Metrics()
+
 blockchain = Blockchain()
 
+# 非同步版本：獨立 event loop 與 keep-alive 連線池
+# Flask view 以 run() 同步等待結果；大量鏈上查詢的公開 API 由同一個 event loop 上的 async_server 提供
+async_blockchain = AsyncBlockchain(blockchain)
+
+# aiohttp 伺服器（ASYNC_SERVER_PORT，設為 0 時不啟動）：request 以 coroutine 處理，不佔用 worker 執行緒
+ASYNC_SERVER_PORT = int(os.environ.get("ASYNC_SERVER_PORT", "5001"))
+async_server = AsyncServer(async_blockchain, metrics, port=ASYNC_SERVER_PORT)
+
+bulk_jobs = JobRegistry()
+
+# Flask 版交易狀態串流單次連線的最長時間（秒）
+TX_STREAM_SECONDS = 25
+
 
 # Read MySQL Config
-with open("./config/database.yml", 'r') as stream:
+with open(os.environ.get("DATABASE_CONFIG", "./config/database.yml"), 'r') as stream:
     try:
         mysql_config = yaml.safe_load(stream)
     except yaml.YAMLError as exc:
         print(exc)
 
-# Set MySQL Config
-app.config["MYSQL_HOST"] = mysql_config["host"]
-app.config["MYSQL_USER"] = mysql_config["username"]
-app.config["MYSQL_PASSWORD"] = mysql_config["password"]
-app.config["MYSQL_DB"] = mysql_config["database"]
+# Construct MySQL connection pool and Student / School data layer
+mysql_pool = ConnectionPool(mysql_config, size=mysql_config.get("pool_size", 8),
+                            cursor_wrapper=metrics.wrap_cursor)
+directory = StudentDirectory(mysql_pool)
+credential_store = CredentialStore(mysql_pool)
+pending_deploys = PendingDeployStore(mysql_pool)
+
+# 鏈上事件索引器（本地課程與學籍狀態 read model）
+indexer = EventIndexer(blockchain, mysql_config)
 
-# Construct MySQL Object
-mysql = MySQL(app)
+# 記錄 Blockchain 各方法的呼叫次數與耗時（統計用的方法本身不記錄）
+metrics.instrument(blockchain, "blockchain", exclude=(
+    "count_rpc", "add_thread_rpc_count", "get_thread_rpc_count", "rpc_stats", "record_write", "cache_stats",
+    "get_contract_instance", "get_account", "supports_batch_courses", "supports_registry",
+    "get_cached_block_number", "set_block_number", "prepare_calls", "decode_calls"))
+metrics.instrument(async_blockchain, "async_blockchain")
+metrics.init_app(app, rpc_counter=blockchain.get_thread_rpc_count)
 
 
 # 確認學校使用者是否登入
@@ -36,47 +71,108 @@ def check_school_login():
 def check_student_login():
     return session.get('student_id')
 
-# 取得學校的 name
-def get_school_name(school_id: str):
-    cur = mysql.connection.cursor()
-    command = "SELECT name FROM School WHERE id = %s"
-    cur.execute(command, (school_id, ))
-    id_list = cur.fetchall()
-    cur.close()
-    name = id_list[0][0]
-    return name
-
-# 將合約地址儲存於學生的 table 內
-def store_contract_address(student_address: str, contract_address: str):
+# 取得課程紀錄 - 索引器已同步且該合約的事件都能還原時查本地資料表，否則直接查鏈上
+def get_courses(contract_address: str):
+    if indexer.is_synced():
+        with mysql_pool.cursor() as cur:
+            if not is_indexer_fallback(cur, contract_address):
+                return get_indexed_courses(cur, contract_address)
+    return async_blockchain.run(async_blockchain.get_courses(contract_address))
+
+# 取得學籍狀態與是否滿足畢業條件 - 索引器已同步時查本地資料表（畢業條件為索引器向合約查詢的結果），否則直接查鏈上
+def get_education_status_and_check_finish(contract_address: str):
+    if indexer.is_synced():
+        with mysql_pool.cursor() as cur:
+            if not is_indexer_fallback(cur, contract_address):
+                check_finish = get_indexed_eligibility(cur, contract_address)
+                if check_finish is not None:
+                    return get_indexed_education_status(cur, contract_address), check_finish
+    return async_blockchain.run(async_blockchain.get_certificate_status(contract_address))
+
+# /metrics 輸出時收集 RPC、交易、快取與節點的即時統計
+def collect_metrics():
+    rpc_stats = blockchain.rpc_stats()
+    families = [
+        ("chain_rpc_requests_total", "counter", "JSON-RPC round trips by method (batch counts once)",
+         [({"method": method}, count) for method, count in rpc_stats["rpc_counts"].items()]),
+        ("chain_writes_total", "counter", "Transactions sent by contract function",
+         [({"function": fn_name}, stats["count"]) for fn_name, stats in rpc_stats["writes"].items()]),
+        ("chain_write_rpc_calls_total", "counter", "RPC round trips spent building and sending transactions",
+         [({"function": fn_name}, stats["rpc_calls"]) for fn_name, stats in rpc_stats["writes"].items()]),
+        ("chain_pending_transactions", "gauge", "Transactions waiting for a receipt",
+         [({}, blockchain.receipt_tracker.pending_count())]),
+        ("indexer_synced", "gauge", "Whether the event indexer has caught up with the chain",
+         [({}, indexer.is_synced())]),
+    ]
+    if isinstance(blockchain.w3.provider, ProviderPool):
+        nodes = blockchain.w3.provider.stats()
+        families.append(("chain_node_healthy", "gauge", "Node health from the provider pool",
+                         [({"url": node["url"], "role": node["role"]}, node["healthy"]) for node in nodes]))
+        families.append(("chain_node_latency_seconds", "gauge", "EWMA latency per node",
+                         [({"url": node["url"], "role": node["role"]}, node["latency"])
+                          for node in nodes if node["latency"] is not None]))
+    return families + cache_samples({"blockchain": blockchain.cache_stats(), "directory": directory.cache_stats()})
+
+metrics.add_collector(collect_metrics)
+
+# 目前合約編譯結果支援的批次上傳方式
+def get_upload_modes():
+    modes = ["row"]
+    if blockchain.supports_batch_courses():
+        modes.append("batch")
+    if blockchain.supports_registry():
+        modes.append("merkle")
+    return modes
+
+# 上傳頁面只顯示可用的批次上傳方式
+@app.context_processor
+def inject_upload_modes():
+    return {"upload_modes": get_upload_modes()}
+
+# 以 generator 逐段輸出 template，避免整頁組好才回傳
+def stream_template(template_name: str, **context):
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    stream = template.stream(context)
+    stream.enable_buffering(20)
+    return stream
+
+# 取得交易狀態查詢網址：async_server 啟用時由它提供（串流不佔用 Flask worker 執行緒）
+def get_tx_status_url(tx_hash: str):
+    if not ASYNC_SERVER_PORT:
+        return "/tx/" + tx_hash + "/"
+    hostname = urlsplit(request.host_url).hostname
+    if ":" in hostname:
+        hostname = "[" + hostname + "]"
+    return "%s://%s:%d/tx/%s/" % (request.scheme, hostname, ASYNC_SERVER_PORT, tx_hash)
+
+# 部署交易完成後的處理：上鏈時將合約地址寫入 Student Table，寫回成功或交易失敗後移除 PendingDeploy 紀錄
+# 寫回失敗時保留紀錄（錯誤記錄在交易狀態的 callback_error），下次啟動時再補寫
+def get_deploy_callback(student_address: str):
+    def on_deployed(record):
+        if record["status"] == "mined" and \
+                not directory.store_contract_address(student_address, record["contract_address"]):
+            raise RuntimeError("儲存合約地址失敗!")
+        pending_deploys.remove([record["tx_hash"]])
+    return on_deployed
+
+# 記錄已送出的部署交易（失敗時只影響重新啟動後的補寫，不影響這次部署）
+def save_pending_deploys(pairs: list):
     try:
-        cur = mysql.connection.cursor()
-        command = "UPDATE Student SET contract_address = %s WHERE address = %s"
-        cur.execute(command, (contract_address, student_address))
-        mysql.connection.commit()
-        cur.close()
-        return True
-    except:
-        return False
-
-# 透過學號取得合約地址
-def get_contract_address(student_id: str):
-    cur = mysql.connection.cursor()
-    command = "SELECT contract_address FROM Student WHERE id = %s"
-    cur.execute(command, (student_id, ))
-    address_list = cur.fetchall()
-    cur.close()
-    contract_address = address_list[0][0]
-    return contract_address
-
-# 透過學號取得姓名與地址
-def get_name_and_address(student_id: str):
-    cur = mysql.connection.cursor()
-    command = "SELECT name, address FROM Student WHERE id = %s"
-    cur.execute(command, (student_id, ))
-    res_list = cur.fetchall()
-    cur.close()
-    name, address = res_list[0]
-    return name, address
+        pending_deploys.add(pairs)
+    except Exception as exc:
+        print("Failed to save pending deploys:", exc)
+
+# 重新追蹤上次執行時尚未寫回合約地址的部署交易
+def reconcile_pending_deploys():
+    try:
+        pending = pending_deploys.list()
+    except Exception as exc:
+        print("Failed to load pending deploys:", exc)
+        return
+    for tx_hash, student_address in pending:
+        if blockchain.get_transaction_status(tx_hash) is None:
+            blockchain.receipt_tracker.track(tx_hash, on_mined=get_deploy_callback(student_address))
 
 ############################################################################
 
@@ -99,13 +195,9 @@ def student_login():
     elif request.method == "POST":
         student_id = request.form.get("student_id")
         password = request.form.get("password")
-        cur = mysql.connection.cursor()
-        command = "SELECT id FROM Student WHERE id = %s AND password = %s"
-        cur.execute(command, (student_id, password))
-        id_list = cur.fetchall()
-        cur.close()
-        if id_list:
-            session["student_id"] = id_list[0][0]
+        checked_id = directory.check_student_password(student_id, password)
+        if checked_id:
+            session["student_id"] = checked_id
             return redirect("/student/index/")
         else:
             data = {"err_msg": "帳號或密碼錯誤"}
@@ -127,8 +219,7 @@ def student_info():
     if not check_student_login():
         return redirect("/student/login/", code=302)
     student_id = session.get("student_id")
-    contract_address = get_contract_address(student_id)
-    student_name, student_address = get_name_and_address(student_id)
+    student_name, student_address, contract_address = directory.get_student(student_id)
     data = {"student_id": student_id, "student_name": student_name, 
             "student_address": student_address, "contract_address": contract_address}
     return render_template("student_info.html", data=data)
@@ -140,14 +231,9 @@ def student_course():
     if not check_student_login():
         return redirect("/student/login/", code=302)
     student_id = session.get("student_id")
-    contract_address = get_contract_address(student_id)
-    # 先找出該合約（學生）總共修過多少課程
-    course_count = blockchain.get_course_count(contract_address)
-    # 而後逐一取得其課程資訊
-    course_info_list = list()
-    for i in range(course_count):
-        course_info = blockchain.get_course(contract_address, i)
-        course_info_list.append(course_info)
+    contract_address = directory.get_contract_address(student_id)
+    # 取得該合約（學生）的所有課程資訊
+    course_info_list = get_courses(contract_address)
     data = {"student_id": student_id, "course_info_list": course_info_list}
     return render_template("student_course.html", data=data)
 
@@ -159,14 +245,12 @@ def student_certificate():
         return redirect("/student/login/", code=302)
     if request.method == "GET":
         student_id = session.get("student_id")
-        contract_address = get_contract_address(student_id)
-        # 查看目前學籍狀態
-        education_status = blockchain.get_education_status(contract_address)
+        contract_address = directory.get_contract_address(student_id)
+        # 查看目前學籍狀態，並檢查該學生是否滿足畢業條件
+        education_status, check_finish = get_education_status_and_check_finish(contract_address)
         mapping_dict = {"undergraduate": "肄業", "learing": "在學中", "graduate": "已畢業"}
         education_status = mapping_dict[education_status]
         education_status_bool = False if education_status == "已畢業" else True
-        # 檢查該學生是否滿足畢業條件
-        check_finish = blockchain.check_finish_certificate(contract_address)
         if check_finish:
             data = {"student_id": student_id, "education_status": education_status,
                     "education_status_bool": education_status_bool,
@@ -181,19 +265,17 @@ def student_certificate():
         try:
             student_id = session.get("student_id")
             student_key = request.form.get("student_key")
-            contract_address = get_contract_address(student_id)
+            contract_address = directory.get_contract_address(student_id)
             # 修改學籍狀態（畢業）
             tx_hash = blockchain.set_certificate(student_key, contract_address)
             
-            # 查看目前學籍狀態
-            education_status = blockchain.get_education_status(contract_address)
+            # 查看目前學籍狀態，並檢查該學生是否滿足畢業條件（同時送出）
+            education_status, check_finish = async_blockchain.run(
+                async_blockchain.get_certificate_status(contract_address))
             mapping_dict = {"undergraduate": "肄業",
                             "learing": "在學中", "graduate": "已畢業"}
             education_status = mapping_dict[education_status]
             education_status_bool = False if education_status == "已畢業" else True
-            # 檢查該學生是否滿足畢業條件
-            check_finish = blockchain.check_finish_certificate(
-                contract_address)
             if check_finish:
                 data = {"student_id": student_id, "education_status": education_status,
                         "education_status_bool": education_status_bool,
@@ -203,8 +285,9 @@ def student_certificate():
                         "education_status_bool": education_status_bool,
                         "status": "尚未滿足畢業門檻", "status_bool": check_finish}
             if tx_hash:
-                data["suc_msg"] = "修改成功! 恭喜畢業!"
+                data["suc_msg"] = "已送出畢業申請! 交易上鏈後即完成"
                 data["tx_hash"] = "Hash: " + tx_hash
+                data["tx_status_url"] = get_tx_status_url(tx_hash)
                 return render_template("student_certificate.html", data=data)
             else:
                 data["err_msg"] = "修改失敗!"
@@ -214,6 +297,16 @@ def student_certificate():
             return render_template("student_certificate.html", data=data)
         
         
+# 學生端 - 取得 Merkle root 模式下的修課紀錄與 inclusion proof
+@app.route("/student/credentials/", methods=["GET"])
+def student_credentials():
+    if not check_student_login():
+        return redirect("/student/login/", code=302)
+    student_id = session.get("student_id")
+    return jsonify({"student_id": student_id,
+                    "credentials": credential_store.get_student_credentials(student_id)})
+
+
 # 學生端 - 登出
 @app.route("/student/logout/", methods=["GET", "POST"])
 def student_logout():
@@ -236,13 +329,9 @@ def school_login():
     elif request.method == "POST":
         school_id = request.form.get("school_id")
         password = request.form.get("password")
-        cur = mysql.connection.cursor()
-        command = "SELECT id FROM School WHERE id = %s AND password = %s"
-        cur.execute(command, (school_id, password))
-        id_list = cur.fetchall()
-        cur.close()
-        if id_list:
-            session["school_id"] = id_list[0][0]
+        checked_id = directory.check_school_password(school_id, password)
+        if checked_id:
+            session["school_id"] = checked_id
             return redirect("/school/index/")
         else:
             data = {"err_msg": "帳號或密碼錯誤"}
@@ -270,29 +359,23 @@ def school_new():
         try:
             school_id = session.get("school_id")
             school_key = request.form.get("school_private_key")
-            school_name = get_school_name(school_id)
+            school_name = directory.get_school_name(school_id)
             student_address = request.form.get("student_address")
             student_name = request.form.get("student_name")
             major = request.form.get("major")
             minor = request.form.get("minor")
             enroll_year = int(request.form.get("enroll_year"))
-            # 部署合約
-            contract_address, contract_instance = blockchain.deploy_contract(
-                school_key, student_address, student_name, school_name, major, minor, enroll_year)
-            # 將合約地址寫入資料庫的 Student Table
-            res_status = store_contract_address(
-                student_address, contract_address)
-            if res_status:
-                data = {"school_id": school_id,
-                        "suc_msg": "部署合約成功!",
-                        "contract_address": "合約地址: " + str(contract_address),
-                        }
-                return render_template("school_new.html", data=data)
-            else:
-                data = {"school_id": school_id,
-                        "err_msg": "儲存合約地址失敗!",
-                        }
-                return render_template("school_new.html", data=data)
+            # 部署合約（不等待上鏈），上鏈後由 receipt tracker 於背景將合約地址寫入 Student Table
+            tx_hash = blockchain.submit_deploy_contract(
+                school_key, student_address, student_name, school_name, major, minor, enroll_year,
+                on_mined=get_deploy_callback(student_address))
+            save_pending_deploys([(tx_hash, student_address)])
+            data = {"school_id": school_id,
+                    "suc_msg": "部署交易已送出!",
+                    "contract_address": "Hash: " + tx_hash,
+                    "tx_status_url": get_tx_status_url(tx_hash),
+                    }
+            return render_template("school_new.html", data=data)
         except:
             data = {"school_id": school_id,
                     "err_msg": "部署合約失敗!",
@@ -300,6 +383,91 @@ def school_new():
             return render_template("school_new.html", data=data)
 
 
+# 學校端 - 批次發起新合約（CSV / JSONL 新生名冊），回傳工作 ID
+@app.route("/school/new/bulk/", methods=["POST"])
+def school_new_bulk():
+    if not check_school_login():
+        return redirect("/school/login/", code=302)
+    school_key = request.form.get("school_private_key")
+    roster_file = request.files.get("roster_file")
+    if not school_key or not roster_file:
+        return jsonify({"err_msg": "缺少學校私鑰或名冊檔案!"}), 400
+    try:
+        roster = list(parse_records(roster_file.stream, roster_file.filename, ROSTER_FIELDS))
+    except ValueError as exc:
+        return jsonify({"err_msg": "檔案格式錯誤! " + str(exc)}), 400
+    return submit_deploy_job(school_key, directory.get_school_name(session.get("school_id")), roster)
+
+
+# 學校端 - 重試批次部署中失敗的學生
+@app.route("/school/new/bulk/<job_id>/retry/", methods=["POST"])
+def school_new_bulk_retry(job_id):
+    if not check_school_login():
+        return redirect("/school/login/", code=302)
+    school_key = request.form.get("school_private_key")
+    job = bulk_jobs.get(job_id)
+    if job is None:
+        return jsonify({"err_msg": "找不到該工作!"}), 404
+    if not school_key:
+        return jsonify({"err_msg": "缺少學校私鑰!"}), 400
+    # 等待收據逾時的交易仍可能上鏈：先向節點確認，已上鏈者直接寫回合約地址，確定失敗者才重新部署
+    timeout_rows = job.rows_with_status("timeout")
+    statuses = blockchain.check_transactions([row["tx_hash"] for row in timeout_rows])
+    deployed_rows = list()
+    for row in timeout_rows:
+        record = statuses[row["tx_hash"]]
+        if record["status"] == "mined" and record["contract_address"]:
+            deployed_rows.append((row, record["contract_address"]))
+        elif record["status"] in ("reverted", "dropped"):
+            job.update_row(row["row"], status="failed", error="Deployment " + record["status"])
+    if deployed_rows:
+        stored = directory.store_contract_addresses(
+            [(row["student_address"], contract_address) for row, contract_address in deployed_rows])
+        for row, contract_address in deployed_rows:
+            if stored:
+                job.update_row(row["row"], status="deployed", contract_address=contract_address, error=None)
+            else:
+                job.update_row(row["row"], status="store_failed", contract_address=contract_address,
+                               error="儲存合約地址失敗")
+        if stored:
+            pending_deploys.remove([row["tx_hash"] for row, _ in deployed_rows])
+    roster = job.failed_rows(ROSTER_FIELDS)
+    return submit_deploy_job(school_key, directory.get_school_name(session.get("school_id")), roster)
+
+
+# 學校端 - 查詢批次部署進度
+@app.route("/school/new/bulk/<job_id>/", methods=["GET"])
+def school_new_bulk_status(job_id):
+    return school_upload_bulk_status(job_id)
+
+
+# 在背景送出整批部署交易、輪詢收據後一次寫回合約地址
+def submit_deploy_job(school_key: str, school_name: str, roster: list):
+    def deploy_task(job):
+        # 每筆交易送出後即記錄，程式在等待收據期間重新啟動也能補寫合約地址
+        def on_update(index, **kwargs):
+            job.update_row(index, **kwargs)
+            if kwargs.get("status") == "submitted":
+                save_pending_deploys([(kwargs["tx_hash"], roster[index]["student_address"])])
+
+        results = blockchain.deploy_contracts(school_key, school_name, roster, on_update=on_update)
+        address_pairs = [(entry["student_address"], result["contract_address"])
+                         for entry, result in zip(roster, results) if result["contract_address"]]
+        stored = directory.store_contract_addresses(address_pairs)
+        if not stored:
+            for index, result in enumerate(results):
+                if result["contract_address"]:
+                    job.update_row(index, status="store_failed", error="儲存合約地址失敗")
+        # 已寫回或確定失敗的交易不需再補寫；逾時與寫回失敗者保留
+        pending_deploys.remove([result["tx_hash"] for result in results if result["tx_hash"] and (
+            result["status"] == "failed" or (result["status"] == "deployed" and stored))])
+
+    job = bulk_jobs.submit_task(roster, deploy_task)
+    return jsonify({"job_id": job.job_id,
+                    "status_url": "/school/new/bulk/" + job.job_id + "/",
+                    "retry_url": "/school/new/bulk/" + job.job_id + "/retry/"}), 202
+
+
 # 學校端 - 上傳課程紀錄
 @app.route("/school/upload/", methods=["GET", "POST"])
 def school_upload():
@@ -312,20 +480,21 @@ def school_upload():
         try:
             school_id = session.get("school_id")
             school_key = request.form.get("school_private_key")
-            school_name = get_school_name(school_id)
+            school_name = directory.get_school_name(school_id)
             student_id = request.form.get("student_id")
             course_name = request.form.get("course_name")
             course_content = request.form.get("course_content")
             course_comment = request.form.get("course_comment")
             course_grade = int(request.form.get("course_grade"))
-            contract_address = get_contract_address(student_id)
+            contract_address = directory.get_contract_address(student_id)
             # 上傳課程紀錄
             tx_hash = blockchain.set_course(
                 school_key, contract_address, course_name, course_content, course_comment, course_grade)
             if tx_hash:
                 data = {"school_id": school_id,
-                        "suc_msg": "上傳成功!",
+                        "suc_msg": "已送出上傳交易! 交易上鏈後即完成",
                         "tx_hash": "Hash: " + tx_hash,
+                        "tx_status_url": get_tx_status_url(tx_hash),
                         }
                 return render_template("school_upload.html", data=data)
             else:
@@ -340,19 +509,141 @@ def school_upload():
             return render_template("school_upload.html", data=data)
 
 
+# 學校端 - 批次上傳課程紀錄（CSV / JSONL），回傳工作 ID
+@app.route("/school/upload/bulk/", methods=["POST"])
+def school_upload_bulk():
+    if not check_school_login():
+        return redirect("/school/login/", code=302)
+    school_key = request.form.get("school_private_key")
+    course_file = request.files.get("course_file")
+    if not school_key or not course_file:
+        return jsonify({"err_msg": "缺少學校私鑰或課程檔案!"}), 400
+    try:
+        rows = list(parse_records(course_file.stream, course_file.filename))
+        grades = [int(row["grade"]) for row in rows]
+    except ValueError as exc:
+        return jsonify({"err_msg": "檔案格式錯誤! " + str(exc)}), 400
+    mode = request.form.get("mode") or "row"
+    if mode not in get_upload_modes():
+        return jsonify({"err_msg": "目前的合約不支援此上傳方式!"}), 400
+    try:
+        school_account = blockchain.get_account(school_key)
+    except Exception:
+        return jsonify({"err_msg": "學校私鑰格式錯誤!"}), 400
+    if mode == "merkle":
+        # 整批紀錄只在 CredentialRegistry 發布一個 Merkle root
+        registry_address = request.form.get("registry_address")
+        if not registry_address:
+            return jsonify({"err_msg": "缺少 Registry 合約地址!"}), 400
+        for row, grade in zip(rows, grades):
+            row["grade"] = grade
+        job = bulk_jobs.submit_task(rows, lambda job: anchor_credential_batch(job, school_account.key, registry_address))
+        return jsonify({"job_id": job.job_id,
+                        "status_url": "/school/upload/bulk/" + job.job_id + "/"}), 202
+    # 一次查詢所有學生的合約地址
+    address_dict = directory.get_contract_addresses(list({row["student_id"] for row in rows}))
+    for row, grade in zip(rows, grades):
+        row["grade"] = grade
+        row["contract_address"] = address_dict.get(row["student_id"])
+        if not row["contract_address"]:
+            row["status"] = "failed"
+            row["error"] = "找不到該學生的合約地址"
+
+    # 連續送出交易（nonce 由 Blockchain 分配，不等待上鏈）
+    def upload_row(row, on_mined):
+        return blockchain.set_course(school_account.key, row["contract_address"], row["course_name"],
+                                     row["content"], row["comment"], row["grade"], on_mined=on_mined)
+
+    if mode == "batch":
+        # 同一位學生的課程合併成 setCourses 交易（需為支援 setCourses 的合約）
+        job = bulk_jobs.submit_task(rows, lambda job: upload_courses_grouped(job, school_account.key))
+    else:
+        job = bulk_jobs.submit(rows, upload_row)
+    return jsonify({"job_id": job.job_id,
+                    "status_url": "/school/upload/bulk/" + job.job_id + "/"}), 202
+
+
+# 將工作中的所有紀錄建成 Merkle tree，儲存紀錄與 proof 後發布 root
+def anchor_credential_batch(job, school_key: str, registry_address: str):
+    tree = blockchain.build_credential_batch(job.rows)
+    proofs = [blockchain.get_credential_proof(tree, index) for index in range(len(tree))]
+    batch_id = credential_store.save_batch(registry_address, tree, proofs)
+
+    def on_published(record):
+        job.record_receipt(record)
+        if record["status"] == "mined":
+            chain_batch_id = blockchain.get_published_batch_id(registry_address, record["tx_hash"])
+            credential_store.set_chain_batch_id(batch_id, chain_batch_id)
+
+    tx_hash = blockchain.publish_root(school_key, registry_address, tree, on_mined=on_published)
+    credential_store.set_tx_hash(batch_id, tx_hash)
+    for index in range(len(job.rows)):
+        job.mark_submitted(index, tx_hash)
+
+
+# 將工作中同一合約的課程合併，以 setCourses 分批送出
+def upload_courses_grouped(job, school_key):
+    groups = dict()
+    for row in job.rows:
+        if row["status"] == "pending":
+            groups.setdefault(row["contract_address"], list()).append(row["row"])
+    for contract_address, indexes in groups.items():
+        courses = [(job.rows[i]["course_name"], job.rows[i]["content"],
+                    job.rows[i]["comment"], job.rows[i]["grade"]) for i in indexes]
+        try:
+            tx_list = blockchain.set_courses(school_key, contract_address, courses, on_mined=job.record_receipt)
+        except Exception as exc:
+            for i in indexes:
+                job.update_row(i, status="failed", error=str(exc))
+            continue
+        position = 0
+        for tx_hash, course_count in tx_list:
+            for i in indexes[position:position + course_count]:
+                job.mark_submitted(i, tx_hash)
+            position += course_count
+
+
+# 學校端 - 查詢批次上傳進度
+@app.route("/school/upload/bulk/<job_id>/", methods=["GET"])
+def school_upload_bulk_status(job_id):
+    if not check_school_login():
+        return redirect("/school/login/", code=302)
+    job = bulk_jobs.get(job_id)
+    if job is None:
+        return jsonify({"err_msg": "找不到該工作!"}), 404
+    include_rows = request.args.get("rows", "1") != "0"
+    return jsonify(job.to_dict(include_rows=include_rows))
+
+
 # 學校端 - 查看學生資訊
 @app.route("/school/view/", methods=["GET"])
 def school_view():
     if not check_school_login():
         return redirect("/school/login/", code=302)
-    cur = mysql.connection.cursor()
-    command = "SELECT id, name, address, contract_address FROM Student"
-    cur.execute(command)
-    student_list = cur.fetchall()
-    cur.close()
-    data = {"school_id": session.get(
-        "school_id"), "student_list": student_list}
-    return render_template("school_view.html", data=data)
+    # 篩選條件與分頁（keyset：以上一頁最後一個學號為起點）
+    filters = {"id": request.args.get("id", ""), "name": request.args.get("name", ""),
+               "contract": request.args.get("contract", ""), "enrich": request.args.get("enrich", "")}
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 500)
+    student_list, has_next = directory.list_students(
+        after_id=request.args.get("after"), limit=limit, id_prefix=filters["id"],
+        name=filters["name"], contract_status=filters["contract"])
+    # 選擇性以一次 batch 查詢本頁學生的課程數量與學籍狀態
+    summaries = dict()
+    if filters["enrich"] and student_list:
+        contract_addresses = [each[3] for each in student_list if each[3]]
+        try:
+            summaries = blockchain.get_contract_summaries(contract_addresses)
+        except Exception:
+            # 整批查詢失敗（例如節點無回應）時每一列都標示錯誤
+            summaries = {contract_address: (None, None, "鏈上查詢失敗") for contract_address in contract_addresses}
+    next_url = None
+    if has_next:
+        next_url = "/school/view/?" + urlencode(
+            {**{k: v for k, v in filters.items() if v}, "limit": limit, "after": student_list[-1][0]})
+    data = {"school_id": session.get("school_id"), "filters": filters, "limit": limit,
+            "student_list": [tuple(each) + summaries.get(each[3], (None, None, None)) for each in student_list],
+            "enrich": bool(filters["enrich"]), "next_url": next_url}
+    return Response(stream_with_context(stream_template("school_view.html", data=data)))
 
 
 # 學校端 - 登出
@@ -363,7 +654,84 @@ def school_logout():
 
 ############################################################################
 
+# 公開驗證 API - 查詢一或多個合約的個人資料、修課紀錄、學籍狀態與畢業資格
+# GET /verify/<address>/、GET /verify/?address=...&address=...、POST /verify/ {"addresses": [...]}
+# ETag 以區塊高度與查詢的合約地址計算，區塊未前進時可回傳 304
+@app.route("/verify/", methods=["GET", "POST"])
+@app.route("/verify/<contract_address>/", methods=["GET"])
+def verify(contract_address=None):
+    if contract_address:
+        contract_addresses = [contract_address]
+    elif request.method == "POST":
+        contract_addresses = get_posted_addresses(request.get_json(silent=True))
+    else:
+        contract_addresses = request.args.getlist("address")
+    error = check_verify_addresses(contract_addresses)
+    if error:
+        return jsonify({"err_msg": error}), 400
+    block_number = blockchain.get_block_number()
+    etag = get_verify_etag(block_number, contract_addresses)
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={"ETag": '"' + etag + '"'})
+    # ETag、回應中的 block_number 與所有讀取都使用同一個區塊
+    transcripts = blockchain.get_transcripts(contract_addresses, block_number)
+    body = {"block_number": block_number, "results": transcripts} if not contract_address else \
+        dict(transcripts[0], block_number=block_number)
+    response = jsonify(body)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "public, no-cache"
+    return response
+
+
+# 交易狀態 - 查詢某筆交易是否已上鏈（mined / reverted / dropped）與 gas 用量
+@app.route("/tx/<tx_hash>/", methods=["GET"])
+def transaction_status(tx_hash):
+    record = blockchain.get_transaction_status(tx_hash)
+    if record is None:
+        return jsonify({"err_msg": "找不到該交易!"}), 404
+    return jsonify(record)
+
+
+# 交易狀態 - server-sent events，狀態改變時推送，交易完成後結束
+# async_server 未啟用時的備援：每次連線最多佔用 worker 執行緒 TX_STREAM_SECONDS 秒，之後由瀏覽器自動重新連線
+@app.route("/tx/<tx_hash>/stream/", methods=["GET"])
+def transaction_status_stream(tx_hash):
+    def generate():
+        last_status = None
+        deadline = time.monotonic() + TX_STREAM_SECONDS
+        yield "retry: 1000\n\n"
+        while time.monotonic() < deadline:
+            record = blockchain.get_transaction_status(tx_hash)
+            if record is None:
+                yield "event: error\ndata: {}\n\n"
+                return
+            if record["status"] != last_status:
+                last_status = record["status"]
+                yield "data: " + json.dumps(record) + "\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if record["status"] != "pending":
+                return
+            time.sleep(1)
+    return Response(generate(), mimetype="text/event-stream")
+
+############################################################################
+
+# 啟動鏈上事件索引器、async_server 與未完成部署的補寫；debug 模式下只在 reloader 的子行程啟動，避免重複執行
+def start_indexer():
+    if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        indexer.start()
+        if ASYNC_SERVER_PORT:
+            async_server.start()
+        reconcile_pending_deploys()
+
+# 由 WSGI server 載入時直接啟動
+if __name__ != "__main__":
+    start_indexer()
+
 # Main
 if __name__ == "__main__":
     app.secret_key = 'super secret key'
+    app.debug = True
+    start_indexer()
     app.run(debug=True, port=5000)
@@ -1,105 +1,673 @@
 # Blockchain packages
+import os
 import json
+import time
+import hashlib
+import threading
+import requests
+from hexbytes import HexBytes
 from web3 import Web3, HTTPProvider
+from cache import LRUCache
+from nonce_manager import NonceManager
+from receipt_tracker import ReceiptTracker
+from merkle import MerkleTree, hash_record, verify_proof
+from tx_builder import TransactionBuilder
+from provider_pool import ProviderPool
+
+
+# 合約編譯結果
+CERTIFICATE_FILE = "./build/contracts/Certificate.json"
+REGISTRY_FILE = "./build/contracts/CredentialRegistry.json"
+
+# 多節點設定檔（可用環境變數 BLOCKCHAIN_CONFIG 指定其他路徑）
+BLOCKCHAIN_CONFIG = os.environ.get("BLOCKCHAIN_CONFIG", "./config/blockchain.yml")
+
+# setCourses 分批時估算 gas 用的常數（新寫入的 storage word 約 20000 gas）
+COURSE_BASE_GAS = 30000
+STORAGE_WORD_GAS = 20000
+CALLDATA_GAS_PER_BYTE = 16
+TX_BASE_GAS = 60000
+BLOCK_GAS_RATIO = 0.8
+
+# 快取查無資料時的標記（合約回傳值可能為 False / 0）
+_MISSING = object()
 
 
 class Blockchain:
 
     # 初始化 - 建立 w3 物件、智能合約檔案導入、取得 ABI 與 Bytecode 內容
-    def __init__(self):
-        # create a web3.py instance w3 by connecting to the local Ethereum node
-        self.w3 = Web3(HTTPProvider("http://localhost:7545"))
+    def __init__(self, contract_cache_size: int = 1024, account_cache_size: int = 64,
+                 view_cache_size: int = 4096, block_number_ttl: float = 1.0, max_batch_size: int = 500):
+        # create a web3.py instance w3 by connecting to the Ethereum node(s)
+        # 有 config/blockchain.yml 時使用多節點 provider pool，否則連線到本機節點
+        if os.path.exists(BLOCKCHAIN_CONFIG):
+            self.w3 = Web3(ProviderPool.from_config(BLOCKCHAIN_CONFIG))
+        else:
+            self.w3 = Web3(HTTPProvider("http://localhost:7545"))
 
         # GLOBAL VARIABLE: compile your smart contract with truffle first
         self.TRUFFLE_FILE = json.load(
-            open('./build/contracts/Certificate.json'))
+            open(CERTIFICATE_FILE))
         self.ABI = self.TRUFFLE_FILE['abi']
         self.BYTECODE = self.TRUFFLE_FILE['bytecode']
 
-    # 部署合約
-    def deploy_contract(self, school_key, student_address, student_name: str, school_name: str, major: str, minor: str, enroll_year: int):
-        # Initialize a contract object with the smart contract compiled artifacts
-        contract = self.w3.eth.contract(bytecode=self.BYTECODE, abi=self.ABI)
+        # CredentialRegistry（Merkle root 模式）在第一次使用時才載入
+        self.registry_file = None
+
+        # 部署用的合約 factory 只需建立一次
+        self.contract_factory = self.w3.eth.contract(bytecode=self.BYTECODE, abi=self.ABI)
+
+        # JSON-RPC batch 共用的 HTTP session（keep-alive）
+        self.session = requests.Session()
+        self.max_batch_size = max_batch_size
+
+        # 合約實例快取（以 checksum 地址為 key）與帳戶快取（以私鑰指紋為 key）
+        self.contract_cache = LRUCache(contract_cache_size)
+        self.account_cache = LRUCache(account_cache_size)
+
+        # 唯讀呼叫快取，key 包含區塊高度，區塊前進後舊的結果自然失效
+        self.view_cache = LRUCache(view_cache_size)
+        self.block_number_ttl = block_number_ttl
+        self.block_number = None
+        self.block_checked_at = 0.0
+        self.block_lock = threading.Lock()
+
+        # 各帳戶的 nonce 分配器，讓同一把私鑰可以連續送出多筆交易
+        self.nonce_manager = NonceManager(self.w3)
+
+        # 交易收據追蹤（背景輪詢，不阻塞 request）
+        self.receipt_tracker = ReceiptTracker(self)
+
+        # 交易建立（快取 gas 估算、gas price 與 chain id）
+        self.tx_builder = TransactionBuilder(self)
+
+        # RPC 次數統計（全域依 method 累計，另以 thread-local 計算單次操作的 RPC 數）
+        self.rpc_lock = threading.Lock()
+        self.rpc_counts = dict()
+        self.rpc_local = threading.local()
+        self.write_stats = dict()  # 函數名稱 -> {"count", "rpc_calls"}
+        self.w3.middleware_onion.add(self._rpc_counter_middleware, name="rpc_counter")
+
+    # web3 middleware：每個 RPC 請求都計數
+    def _rpc_counter_middleware(self, make_request, w3):
+        def middleware(method, params):
+            self.count_rpc(method)
+            return make_request(method, params)
+        return middleware
+
+    # 記錄一次 RPC 往返
+    def count_rpc(self, method: str):
+        with self.rpc_lock:
+            self.rpc_counts[method] = self.rpc_counts.get(method, 0) + 1
+        self.add_thread_rpc_count(1)
+
+    # 累加目前執行緒的 RPC 次數（非同步版在 event loop 送出的 RPC 由呼叫端執行緒計入）
+    def add_thread_rpc_count(self, count: int):
+        self.rpc_local.count = getattr(self.rpc_local, "count", 0) + count
+
+    # 目前執行緒累計的 RPC 次數
+    def get_thread_rpc_count(self):
+        return getattr(self.rpc_local, "count", 0)
+
+    # 取得 RPC 與寫入交易的統計
+    def rpc_stats(self):
+        with self.rpc_lock:
+            writes = {fn_name: dict(stats, rpc_per_write=stats["rpc_calls"] / stats["count"])
+                      for fn_name, stats in self.write_stats.items()}
+            return {"rpc_counts": dict(self.rpc_counts), "writes": writes}
+
+    # 取得合約實例（快取已建立的實例，避免每次重新處理 ABI）
+    def get_contract_instance(self, contract_address: str):
+        checksum_address = Web3.toChecksumAddress(contract_address)
+        contract_instance = self.contract_cache.get(checksum_address)
+        if contract_instance is None:
+            contract_instance = self.w3.eth.contract(
+                abi=self.ABI, address=checksum_address)
+            self.contract_cache.put(checksum_address, contract_instance)
+        return contract_instance
+
+    # 由私鑰取得帳戶物件（以私鑰的雜湊作為 key，不直接保存私鑰字串）
+    def get_account(self, private_key: str):
+        fingerprint = hashlib.sha256(HexBytes(private_key)).hexdigest()
+        account = self.account_cache.get(fingerprint)
+        if account is None:
+            account = self.w3.eth.account.from_key(private_key)
+            self.account_cache.put(fingerprint, account)
+        return account
+
+    # 取得快取命中統計
+    def cache_stats(self):
+        return {"contract": self.contract_cache.stats(),
+                "account": self.account_cache.stats(),
+                "view": self.view_cache.stats(),
+                "tx_builder": self.tx_builder.stats()}
+
+    # 快取中的區塊高度，超過 block_number_ttl 時回傳 None（非同步版查詢前先使用）
+    def get_cached_block_number(self):
+        with self.block_lock:
+            if self.block_number is not None and time.monotonic() - self.block_checked_at < self.block_number_ttl:
+                return self.block_number
+            return None
+
+    # 更新快取的區塊高度（非同步版查詢節點後寫回）
+    def set_block_number(self, block_number: int):
+        with self.block_lock:
+            self.block_number = block_number
+            self.block_checked_at = time.monotonic()
+
+    # 取得最新區塊高度（block_number_ttl 秒內重複使用，避免每次查詢都多一次 RPC）
+    def get_block_number(self):
+        with self.block_lock:
+            now = time.monotonic()
+            if self.block_number is None or now - self.block_checked_at >= self.block_number_ttl:
+                self.block_number = self.w3.eth.blockNumber
+                self.block_checked_at = now
+            return self.block_number
+
+    # 讓某合約的唯讀快取失效（自己送出的交易上鏈時呼叫）
+    def invalidate(self, contract_address: str):
+        checksum_address = Web3.toChecksumAddress(contract_address)
+        self.view_cache.pop_matching(lambda key, value: key[1] == checksum_address)
+        with self.block_lock:
+            self.block_checked_at = 0.0
+
+    # 以 (區塊高度, 合約地址, 函數, 參數) 為 key 的唯讀呼叫快取
+    def cached_call(self, contract_address: str, fn_name: str, args: tuple = ()):
+        block_number = self.get_block_number()
+        key = (block_number, Web3.toChecksumAddress(contract_address), fn_name, tuple(args))
+        result = self.view_cache.get(key, _MISSING)
+        if result is _MISSING:
+            contract_instance = self.get_contract_instance(contract_address)
+            result = contract_instance.functions[fn_name](*args).call(block_identifier=block_number)
+            self.view_cache.put(key, result)
+        return result
+
+    # 簽署並送出交易（nonce 由 nonce_manager 分配），回傳 tx hash
+    # 送出後交由 receipt_tracker 追蹤，上鏈時清除 contract_address 的快取並呼叫 on_mined
+    def send_transaction(self, account, txn_function, contract_address: str = None, on_mined=None):
+        rpc_count_before = self.get_thread_rpc_count()
+        nonce = self.nonce_manager.allocate(account.address)
+        try:
+            construct_txn = self.tx_builder.build(txn_function, account.address, nonce)
+            signed = self.w3.eth.account.sign_transaction(
+                construct_txn, account.key)
+            tx_hash = self.w3.eth.sendRawTransaction(signed.rawTransaction)
+        except Exception:
+            # 送出失敗時歸還 nonce 並與節點重新同步
+            self.nonce_manager.release(account.address, nonce)
+            self.nonce_manager.resync(account.address)
+            raise
+        self.nonce_manager.mark_sent(account.address, nonce, tx_hash.hex())
+        self.record_write(getattr(txn_function, "fn_name", None) or "constructor",
+                          self.get_thread_rpc_count() - rpc_count_before)
+
+        # 交易 revert 時（gas 估算不足或 require 不成立）移除該級距的 gas 快取
+        def on_finished(record):
+            if record["status"] == "reverted":
+                self.tx_builder.invalidate_gas(txn_function, account.address)
+            if on_mined is not None:
+                on_mined(record)
 
-        # Initialize local account object from the private key of a valid Ethereum node address
-        school_account = self.w3.eth.account.from_key(school_key)
+        self.receipt_tracker.track(tx_hash.hex(), account.address, nonce,
+                                   contract_address=contract_address, on_mined=on_finished)
+        return tx_hash
 
-        # build a transaction by invoking the buildTransaction() method from the smart contract constructor function
-        construct_txn = contract.constructor(student_name, student_address, school_name, major, minor, enroll_year).buildTransaction({
-            'from': school_account.address,
-            'nonce': self.w3.eth.getTransactionCount(school_account.address),
-        })
+    # 記錄某次寫入實際花費的 RPC 次數
+    def record_write(self, fn_name: str, rpc_calls: int):
+        with self.rpc_lock:
+            stats = self.write_stats.setdefault(fn_name, {"count": 0, "rpc_calls": 0})
+            stats["count"] += 1
+            stats["rpc_calls"] += rpc_calls
 
-        # sign the deployment transaction with the private key
-        signed = self.w3.eth.account.sign_transaction(
-            construct_txn, school_account.key)
+    # 部署合約並等待上鏈（同步版本，由 submit_deploy_contract 送出、receipt_tracker 回報結果）
+    def deploy_contract(self, school_key, student_address, student_name: str, school_name: str, major: str, minor: str, enroll_year: int, timeout: float = 600.0):
+        tx_hash = self.submit_deploy_contract(
+            school_key, student_address, student_name, school_name, major, minor, enroll_year)
+        contract_address = self.wait_for_deployment(tx_hash, timeout)
+        return contract_address, self.get_contract_instance(contract_address)
 
-        # broadcast the signed transaction to your local network using sendRawTransaction() method and get the transaction hash
-        tx_hash = self.w3.eth.sendRawTransaction(signed.rawTransaction)
-        print(tx_hash.hex())
+    # 等待 receipt_tracker 回報部署交易的結果，回傳合約地址
+    def wait_for_deployment(self, tx_hash: str, timeout: float = 600.0):
+        record = self.wait_for_receipts([tx_hash], timeout=timeout)[tx_hash]
+        if record is None or record["status"] == "pending":
+            raise TimeoutError("Receipt timeout: " + tx_hash)
+        if record["status"] != "mined" or not record["contract_address"]:
+            raise RuntimeError("Deployment " + record["status"] + ": " + tx_hash)
+        return record["contract_address"]
 
-        # collect the Transaction Receipt with contract address when the transaction is mined on the network
-        tx_receipt = self.w3.eth.waitForTransactionReceipt(tx_hash)
-        print("Contract Deployed At:", tx_receipt['contractAddress'])
-        contract_address = tx_receipt['contractAddress']
+    # 送出部署交易但不等待上鏈，回傳 tx hash；on_mined(record) 可由 record["contract_address"] 取得合約地址
+    def submit_deploy_contract(self, school_key, student_address, student_name: str, school_name: str, major: str, minor: str, enroll_year: int, on_mined=None):
+        school_account = self.get_account(school_key)
+        tx_hash = self.send_transaction(school_account, self.contract_factory.constructor(
+            student_name, student_address, school_name, major, minor, enroll_year), on_mined=on_mined)
+        return tx_hash.hex()
+
+    # 批次部署合約 - 先送出所有部署交易，再等待 receipt_tracker 批次輪詢的結果
+    # roster 每一列需有 student_address, student_name, major, minor, enroll_year
+    # 回傳與 roster 對應的結果 [{"status", "tx_hash", "contract_address", "error"}]
+    # status 為 deployed / failed（可重新部署）/ timeout（交易仍可能上鏈，保留 tx_hash，重試前需先 check_transactions）
+    def deploy_contracts(self, school_key, school_name: str, roster: list, on_update=None,
+                         poll_interval: float = 1.0, timeout: float = 600.0):
+        on_update = on_update or (lambda index, **kwargs: None)
+        results = [{"status": "pending", "tx_hash": None, "contract_address": None, "error": None}
+                   for _ in roster]
+        tx_hashes = list()
+        try:
+            for index, entry in enumerate(roster):
+                try:
+                    tx_hash = self.submit_deploy_contract(
+                        school_key, entry["student_address"], entry["student_name"], school_name,
+                        entry["major"], entry["minor"], int(entry["enroll_year"]))
+                except Exception as exc:
+                    results[index].update(status="failed", error=str(exc))
+                    on_update(index, status="failed", error=str(exc))
+                    continue
+                # 等待期間保留收據紀錄，避免大量交易時被 receipt_tracker 淘汰
+                self.receipt_tracker.hold([tx_hash])
+                tx_hashes.append(tx_hash)
+                results[index].update(status="submitted", tx_hash=tx_hash)
+                on_update(index, status="submitted", tx_hash=tx_hash)
+            records = self.wait_for_receipts(tx_hashes, poll_interval, timeout)
+        finally:
+            self.receipt_tracker.release(tx_hashes)
+        # 沒有紀錄的交易（例如程式重新啟動）直接向節點查詢
+        missing = [tx_hash for tx_hash, record in records.items() if record is None]
+        records.update(self.check_transactions(missing))
+        for index, result in enumerate(results):
+            if not result["tx_hash"]:
+                continue
+            record = records[result["tx_hash"]]
+            if record["status"] == "pending":
+                result.update(status="timeout", error="Receipt timeout")
+                on_update(index, status="timeout", error=result["error"])
+            elif record["status"] != "mined" or not record["contract_address"]:
+                result.update(status="failed", error="Deployment " + record["status"])
+                on_update(index, status="failed", error=result["error"])
+            else:
+                result.update(status="deployed", contract_address=record["contract_address"])
+                on_update(index, status="deployed", contract_address=result["contract_address"])
+        return results
+
+    # 等待 receipt_tracker 回報多筆交易的結果，回傳 {tx_hash: record}（逾時者狀態仍為 pending）
+    # 等待期間這些紀錄不會被 receipt_tracker 淘汰
+    def wait_for_receipts(self, tx_hashes: list, poll_interval: float = 1.0, timeout: float = 600.0):
+        deadline = time.monotonic() + timeout
+        self.receipt_tracker.hold(tx_hashes)
+        try:
+            while True:
+                records = {tx_hash: self.receipt_tracker.get(tx_hash) for tx_hash in tx_hashes}
+                waiting = [tx_hash for tx_hash, record in records.items()
+                           if record is not None and record["status"] == "pending"]
+                if not waiting or time.monotonic() >= deadline:
+                    return records
+                time.sleep(poll_interval)
+        finally:
+            self.receipt_tracker.release(tx_hashes)
+
+    # 查詢多筆交易目前的狀態：receipt_tracker 已有結果時直接使用，否則以一次 batch 向節點查詢
+    # 回傳 {tx_hash: {"tx_hash", "status", "contract_address"}}，status 為 mined / reverted / pending / dropped
+    def check_transactions(self, tx_hashes: list):
+        results = dict()
+        unknown = list()
+        for tx_hash in tx_hashes:
+            record = self.receipt_tracker.get(tx_hash)
+            if record is not None and record["status"] != "pending":
+                results[tx_hash] = {"tx_hash": tx_hash, "status": record["status"],
+                                    "contract_address": record["contract_address"]}
+            else:
+                unknown.append(tx_hash)
+        if not unknown:
+            return results
+        payload = [{"jsonrpc": "2.0", "id": i, "method": "eth_getTransactionReceipt", "params": [tx_hash]}
+                   for i, tx_hash in enumerate(unknown)]
+        payload += [{"jsonrpc": "2.0", "id": len(unknown) + i, "method": "eth_getTransactionByHash",
+                     "params": [tx_hash]} for i, tx_hash in enumerate(unknown)]
+        responses = self.batch_request(payload)
+        for i, tx_hash in enumerate(unknown):
+            receipt = responses.get(i, dict()).get("result")
+            contract_address = None
+            if receipt:
+                status = "mined" if int(receipt["status"], 16) == 1 else "reverted"
+                if receipt.get("contractAddress"):
+                    contract_address = Web3.toChecksumAddress(receipt["contractAddress"])
+            elif responses.get(len(unknown) + i, dict()).get("result"):
+                status = "pending"
+            else:
+                status = "dropped"
+            results[tx_hash] = {"tx_hash": tx_hash, "status": status, "contract_address": contract_address}
+        return results
 
-        # Initialize a contract instance object using the contract address which can be used to invoke contract functions
-        contract_instance = self.w3.eth.contract(
-            abi=self.ABI, address=contract_address)
-        return contract_address, contract_instance
+    # 查詢交易狀態（pending / mined / reverted / dropped 與 gas 用量）
+    def get_transaction_status(self, tx_hash: str):
+        return self.receipt_tracker.get(tx_hash)
 
     # 上傳課程紀錄
-    def set_course(self, school_key: str, contract_address: str, name: str, content: str, comment: str, grade: int):
-        contract_instance = self.w3.eth.contract(
-            abi=self.ABI, address=contract_address)
-        school_account = self.w3.eth.account.from_key(school_key)
-        construct_txn = contract_instance.functions.setCourse(name, content, comment, grade).buildTransaction({
-            'from': school_account.address,
-            'nonce': self.w3.eth.getTransactionCount(school_account.address),
-        })
-        signed = self.w3.eth.account.sign_transaction(
-            construct_txn, school_account.key)
-        tx_hash = self.w3.eth.sendRawTransaction(signed.rawTransaction)
+    def set_course(self, school_key: str, contract_address: str, name: str, content: str, comment: str, grade: int, on_mined=None):
+        contract_instance = self.get_contract_instance(contract_address)
+        school_account = self.get_account(school_key)
+        tx_hash = self.send_transaction(
+            school_account, contract_instance.functions.setCourse(name, content, comment, grade),
+            contract_address=contract_address, on_mined=on_mined)
+        self.invalidate(contract_address)
         return tx_hash.hex()
     
+    # 編譯結果的 ABI 是否包含 setCourses / getCourses（合約修改後需以 truffle 重新編譯）
+    def supports_batch_courses(self):
+        fn_names = {each.get("name") for each in self.ABI if each.get("type") == "function"}
+        return {"setCourses", "getCourses"} <= fn_names
+
+    # 是否已編譯 CredentialRegistry 合約（Merkle root 模式）
+    def supports_registry(self):
+        return self.registry_file is not None or os.path.exists(REGISTRY_FILE)
+
+    # 一次上傳多筆課程紀錄 courses = [(name, content, comment, grade)]
+    # 依區塊 gas 上限切成多筆 setCourses 交易，回傳 [(tx_hash, 該交易的課程數)]
+    def set_courses(self, school_key: str, contract_address: str, courses: list, on_mined=None):
+        if not self.supports_batch_courses():
+            raise ValueError("Certificate ABI has no setCourses, recompile the contracts")
+        contract_instance = self.get_contract_instance(contract_address)
+        school_account = self.get_account(school_key)
+        gas_limit = int(self.tx_builder.get_gas_limit() * BLOCK_GAS_RATIO)
+        tx_list = list()
+        for chunk in self.chunk_courses(courses, gas_limit):
+            names, contents, comments, grades = [list(field) for field in zip(*chunk)]
+            tx_hash = self.send_transaction(
+                school_account, contract_instance.functions.setCourses(names, contents, comments, grades),
+                contract_address=contract_address, on_mined=on_mined)
+            tx_list.append((tx_hash.hex(), len(chunk)))
+        self.invalidate(contract_address)
+        return tx_list
+
+    # 依估算的 gas 將課程切成多段，每段不超過 gas_limit
+    @staticmethod
+    def chunk_courses(courses: list, gas_limit: int):
+        chunks = list()
+        chunk = list()
+        chunk_gas = TX_BASE_GAS
+        for course in courses:
+            course_gas = Blockchain.estimate_course_gas(*course)
+            if chunk and chunk_gas + course_gas > gas_limit:
+                chunks.append(chunk)
+                chunk = list()
+                chunk_gas = TX_BASE_GAS
+            chunk.append(course)
+            chunk_gas += course_gas
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    # 估算寫入一筆課程所需的 gas（storage 寫入 + calldata）
+    @staticmethod
+    def estimate_course_gas(name: str, content: str, comment: str, grade: int):
+        storage_words = 1  # grade
+        calldata_bytes = 4 * 32
+        for text in (name, content, comment):
+            length = len(text.encode("utf-8"))
+            # 短於 32 bytes 的字串與長度存在同一個 slot
+            storage_words += 1 if length < 32 else 1 + (length + 31) // 32
+            calldata_bytes += 64 + (length + 31) // 32 * 32
+        return COURSE_BASE_GAS + STORAGE_WORD_GAS * storage_words + CALLDATA_GAS_PER_BYTE * calldata_bytes
+
+    # 查詢某區段的課程資訊（單次 eth_call）
+    def get_course_range(self, contract_address: str, start: int, count: int):
+        if not self.supports_batch_courses():
+            raise ValueError("Certificate ABI has no getCourses, recompile the contracts")
+        names, contents, comments, grades = self.cached_call(contract_address, "getCourses", (start, count))
+        return [list(course_info) for course_info in zip(names, contents, comments, grades)]
+
     # 查詢某合約中存放的課程數量
     def get_course_count(self, contract_address: str):
-        contract_instance = self.w3.eth.contract(
-            abi=self.ABI, address=contract_address)
-        course_count = contract_instance.functions.getCourseCount().call()
+        course_count = self.cached_call(contract_address, "getCourseCount")
         return course_count
     
     # 查詢某 index 位置的課程資訊
     def get_course(self, contract_address: str, index: int):
-        contract_instance = self.w3.eth.contract(
-            abi=self.ABI, address=contract_address)
-        course_info = contract_instance.functions.getCourse(index).call()
+        course_info = self.cached_call(contract_address, "getCourse", (index, ))
         return course_info
 
+    # 一次取得某合約中的所有課程資訊（以 JSON-RPC batch 取代逐筆查詢）
+    def get_courses(self, contract_address: str):
+        course_count = self.get_course_count(contract_address)
+        calls = [(contract_address, "getCourse", [i]) for i in range(course_count)]
+        return [list(course_info) for course_info in self.batch_call(calls)]
+
+    # 以一次 batch 查詢多個合約的課程數量與學籍狀態，回傳 {contract_address: (course_count, education_status, error)}
+    # 個別合約查詢失敗時只在該合約的 error 記錄原因
+    def get_contract_summaries(self, contract_addresses: list):
+        summaries = dict()
+        valid_addresses = list()
+        for contract_address in contract_addresses:
+            if Web3.isAddress(contract_address):
+                valid_addresses.append(contract_address)
+            else:
+                summaries[contract_address] = (None, None, "Invalid address")
+        calls = list()
+        for contract_address in valid_addresses:
+            calls.append((contract_address, "getCourseCount", []))
+            calls.append((contract_address, "getEducationStatus", []))
+        results = self.batch_call(calls, raise_errors=False)
+        for i, contract_address in enumerate(valid_addresses):
+            course_count, education_status = results[2 * i], results[2 * i + 1]
+            errors = [result for result in (course_count, education_status) if isinstance(result, Exception)]
+            if errors:
+                summaries[contract_address] = (None, None, str(errors[0]))
+            else:
+                summaries[contract_address] = (course_count, education_status, None)
+        return summaries
+
+    # 批次查詢多個合約的完整成績單（個人資料、課程、學籍狀態、是否滿足畢業條件），依輸入順序回傳
+    # 兩次 batch 皆讀取同一個區塊（未指定 block_number 時取目前區塊高度）
+    def get_transcripts(self, contract_addresses: list, block_number: int = None):
+        if block_number is None:
+            block_number = self.get_block_number()
+        plan = self.plan_transcripts(contract_addresses)
+        try:
+            calls = next(plan)
+            while True:
+                calls = plan.send(self.batch_call(calls, raise_errors=False, block_number=block_number))
+        except StopIteration as stop:
+            return stop.value
+
+    # 成績單查詢的步驟（同步版與非同步版共用）：以 yield 交出每一輪要 batch 的呼叫並接收結果
+    # 第一輪取得各合約的基本資料與課程數，第二輪取得所有課程；失敗的呼叫以 exception 物件傳回
+    @staticmethod
+    def plan_transcripts(contract_addresses: list):
+        transcripts = dict()
+        valid_addresses = list()
+        for contract_address in contract_addresses:
+            if Web3.isAddress(contract_address):
+                valid_addresses.append(Web3.toChecksumAddress(contract_address))
+            else:
+                transcripts[contract_address] = {"contract_address": contract_address, "error": "Invalid address"}
+        summary_fns = ("profile", "getEducationStatus", "checkFinishCertificate", "getCourseCount")
+        summary_results = yield [(contract_address, fn_name, []) for contract_address in valid_addresses
+                                 for fn_name in summary_fns]
+        course_calls = list()
+        summaries = dict()
+        for i, contract_address in enumerate(valid_addresses):
+            profile, education_status, check_finish, course_count = \
+                summary_results[i * len(summary_fns):(i + 1) * len(summary_fns)]
+            errors = [result for result in (profile, education_status, check_finish, course_count)
+                      if isinstance(result, Exception)]
+            if errors:
+                transcripts[contract_address] = {"contract_address": contract_address, "error": str(errors[0])}
+                continue
+            summaries[contract_address] = (profile, education_status, check_finish, course_count)
+            course_calls.extend((contract_address, "getCourse", [index]) for index in range(course_count))
+        course_results = iter((yield course_calls))
+        for contract_address, (profile, education_status, check_finish, course_count) in summaries.items():
+            courses = [next(course_results) for _ in range(course_count)]
+            errors = [course for course in courses if isinstance(course, Exception)]
+            if errors:
+                transcripts[contract_address] = {"contract_address": contract_address, "error": str(errors[0])}
+                continue
+            name, account, school_name, major, minor, enroll_year = profile
+            transcripts[contract_address] = {
+                "contract_address": contract_address,
+                "profile": {"name": name, "account": account, "school_name": school_name,
+                            "major": major, "minor": minor, "enroll_year": enroll_year},
+                "education_status": education_status,
+                "eligible_to_graduate": check_finish,
+                "courses": [dict(zip(("name", "content", "comment", "grade"), course)) for course in courses],
+            }
+        return [transcripts[Web3.toChecksumAddress(contract_address) if Web3.isAddress(contract_address)
+                            else contract_address] for contract_address in contract_addresses]
+
+    # 將多個唯讀合約呼叫 (contract_address, fn_name, args) 合併成一次 JSON-RPC batch 送出
+    # 已在目前區塊快取過的呼叫不會再送出；raise_errors=False 時失敗的呼叫以 exception 物件回傳
+    # block_number 指定讀取的區塊（預設為目前區塊高度）
+    def batch_call(self, calls: list, raise_errors: bool = True, block_number: int = None):
+        if not calls:
+            return []
+        if block_number is None:
+            block_number = self.get_block_number()
+        results, payload, pending = self.prepare_calls(calls, block_number)
+        if payload:
+            self.decode_calls(results, pending, self.batch_request(payload), raise_errors)
+        return results
+
+    # 將唯讀呼叫編碼成 eth_call payload（同步版與非同步版共用）
+    # 回傳 (results, payload, pending)：已快取的結果直接填入 results，其餘以 payload 的 id 對應 results 的位置
+    def prepare_calls(self, calls: list, block_number: int):
+        results = list()
+        payload = list()
+        pending = dict()  # 結果位置 -> (快取 key, 回傳型別)
+        for position, (contract_address, fn_name, args) in enumerate(calls):
+            contract_instance = self.get_contract_instance(contract_address)
+            key = (block_number, contract_instance.address, fn_name, tuple(args))
+            result = self.view_cache.get(key, _MISSING)
+            results.append(result)
+            if result is not _MISSING:
+                continue
+            data = contract_instance.encodeABI(fn_name=fn_name, args=list(args))
+            payload.append({
+                "jsonrpc": "2.0",
+                "id": position,
+                "method": "eth_call",
+                "params": [{"to": contract_instance.address, "data": data}, hex(block_number)],
+            })
+            pending[position] = (key, self._get_output_types(fn_name))
+        return results, payload, pending
+
+    # 解碼 batch 回應（依 id 索引）並寫入快取；缺少回應或節點回傳錯誤時視為該呼叫失敗
+    # raise_errors=False 時失敗的呼叫以 exception 物件填入 results
+    def decode_calls(self, results: list, pending: dict, responses: dict, raise_errors: bool = True):
+        for position, (key, types) in pending.items():
+            try:
+                response = responses.get(position)
+                if response is None:
+                    raise ValueError("No response for eth_call " + key[2])
+                if "error" in response:
+                    raise ValueError(response["error"])
+                decoded = self.w3.codec.decode_abi(types, HexBytes(response["result"]))
+            except Exception as exc:
+                if raise_errors:
+                    raise
+                results[position] = exc
+                continue
+            result = decoded[0] if len(decoded) == 1 else list(decoded)
+            self.view_cache.put(key, result)
+            results[position] = result
+        return results
+
+    # 送出一組 JSON-RPC batch（超過 max_batch_size 時拆成多次），回傳依 id 索引的結果
+    def batch_request(self, payload: list):
+        responses = dict()
+        provider = self.w3.provider
+        for start in range(0, len(payload), self.max_batch_size):
+            self.count_rpc("batch")
+            chunk = payload[start:start + self.max_batch_size]
+            if isinstance(provider, ProviderPool):
+                response_list = provider.make_batch_request(chunk)
+            else:
+                response = self.session.post(provider.endpoint_uri, json=chunk)
+                response.raise_for_status()
+                response_list = response.json()
+            responses.update({each["id"]: each for each in response_list})
+        return responses
+
+    # 由 ABI 取得某函數的回傳型別
+    def _get_output_types(self, fn_name: str):
+        for entry in self.ABI:
+            if entry.get("type") == "function" and entry.get("name") == fn_name:
+                return [output["type"] for output in entry["outputs"]]
+        raise ValueError("Function not found in ABI: " + fn_name)
+
     # 檢查該學生是否滿足畢業條件
     def check_finish_certificate(self, contract_address: str):
-        contract_instance = self.w3.eth.contract(
-            abi=self.ABI, address=contract_address)
-        check_finish = contract_instance.functions.checkFinishCertificate().call()
+        check_finish = self.cached_call(contract_address, "checkFinishCertificate")
         return check_finish
     
     # 查看目前學籍狀態
     def get_education_status(self, contract_address: str):
-        contract_instance = self.w3.eth.contract(
-            abi=self.ABI, address=contract_address)
-        education_status = contract_instance.functions.getEducationStatus().call()
+        education_status = self.cached_call(contract_address, "getEducationStatus")
         return education_status
     
     # 修改學籍狀態（畢業）
-    def set_certificate(self, student_key: str, contract_address: str):
-        contract_instance = self.w3.eth.contract(
-            abi=self.ABI, address=contract_address)
-        student_account = self.w3.eth.account.from_key(student_key)
-        construct_txn = contract_instance.functions.setCertificate().buildTransaction({
-            'from': student_account.address,
-            'nonce': self.w3.eth.getTransactionCount(student_account.address),
-        })
-        signed = self.w3.eth.account.sign_transaction(
-            construct_txn, student_account.key)
-        tx_hash = self.w3.eth.sendRawTransaction(signed.rawTransaction)
+    def set_certificate(self, student_key: str, contract_address: str, on_mined=None):
+        contract_instance = self.get_contract_instance(contract_address)
+        student_account = self.get_account(student_key)
+        tx_hash = self.send_transaction(
+            student_account, contract_instance.functions.setCertificate(),
+            contract_address=contract_address, on_mined=on_mined)
+        self.invalidate(contract_address)
+        return tx_hash.hex()
+
+    # 取得 CredentialRegistry 的編譯結果（需先以 truffle 編譯）
+    def get_registry_file(self):
+        if self.registry_file is None:
+            self.registry_file = json.load(
+                open(REGISTRY_FILE))
+        return self.registry_file
+
+    # 取得 CredentialRegistry 合約實例（與 Certificate 實例共用快取，key 加上前綴區分）
+    def get_registry_instance(self, registry_address: str):
+        checksum_address = Web3.toChecksumAddress(registry_address)
+        registry_instance = self.contract_cache.get(("registry", checksum_address))
+        if registry_instance is None:
+            registry_instance = self.w3.eth.contract(
+                abi=self.get_registry_file()['abi'], address=checksum_address)
+            self.contract_cache.put(("registry", checksum_address), registry_instance)
+        return registry_instance
+
+    # 部署 CredentialRegistry（整個學校只需部署一次），由 receipt_tracker 回報結果
+    def deploy_registry(self, school_key: str, timeout: float = 600.0):
+        registry_file = self.get_registry_file()
+        registry = self.w3.eth.contract(abi=registry_file['abi'], bytecode=registry_file['bytecode'])
+        school_account = self.get_account(school_key)
+        tx_hash = self.send_transaction(school_account, registry.constructor())
+        return self.wait_for_deployment(tx_hash.hex(), timeout)
+
+    # 將一批修課紀錄建成 Merkle tree（紀錄本身保存在鏈下）
+    def build_credential_batch(self, records: list):
+        return MerkleTree(records)
+
+    # 發布某批次的 Merkle root（一筆交易），回傳 tx hash
+    def publish_root(self, school_key: str, registry_address: str, tree: MerkleTree, on_mined=None):
+        registry_instance = self.get_registry_instance(registry_address)
+        school_account = self.get_account(school_key)
+        tx_hash = self.send_transaction(
+            school_account, registry_instance.functions.publishRoot(tree.root, len(tree)),
+            contract_address=registry_address, on_mined=on_mined)
         return tx_hash.hex()
+
+    # 由 publishRoot 交易的收據取得鏈上的 batch id
+    def get_published_batch_id(self, registry_address: str, tx_hash: str):
+        registry_instance = self.get_registry_instance(registry_address)
+        tx_receipt = self.w3.eth.getTransactionReceipt(tx_hash)
+        events = registry_instance.events.rootPublished().processReceipt(tx_receipt)
+        return events[0]["args"]["batchId"]
+
+    # 取得某筆紀錄的 inclusion proof
+    def get_credential_proof(self, tree: MerkleTree, index: int):
+        return [node.hex() for node in tree.get_proof(index)]
+
+    # 驗證某筆紀錄是否包含在某批次中：先以鏈上的 root 在本地驗證，on_chain=True 時改由合約驗證
+    def verify_credential(self, registry_address: str, batch_id: int, record: dict, proof: list, on_chain: bool = False):
+        leaf = hash_record(record)
+        proof = [HexBytes(node) for node in proof]
+        registry_instance = self.get_registry_instance(registry_address)
+        if on_chain:
+            return registry_instance.functions.verify(batch_id, leaf, proof).call()
+        root, _, _ = registry_instance.functions.getBatch(batch_id).call()
+        return verify_proof(leaf, proof, root)
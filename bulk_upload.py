@@ -0,0 +1,136 @@
+# Bulk upload packages
+import io
+import csv
+import json
+import uuid
+import threading
+from collections import OrderedDict
+
+
+# 課程紀錄檔案的欄位
+COURSE_FIELDS = ("student_id", "course_name", "content", "comment", "grade")
+
+
+# 新生名冊檔案的欄位
+ROSTER_FIELDS = ("student_address", "student_name", "major", "minor", "enroll_year")
+
+
+# 逐行解析 CSV（需有標題列）或 JSONL 檔案，以 generator 回傳每一列的 dict
+def parse_records(stream, filename: str, fields: tuple = COURSE_FIELDS):
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if filename.lower().endswith((".jsonl", ".json")):
+        rows = (json.loads(line) for line in text_stream if line.strip())
+    else:
+        rows = csv.DictReader(text_stream)
+    for row in rows:
+        missing = [field for field in fields if row.get(field) in (None, "")]
+        if missing:
+            raise ValueError("Missing fields: " + ", ".join(missing))
+        yield {field: row[field] for field in fields}
+
+
+class BulkJob:
+
+    # 初始化 - 每一列都有自己的處理狀態與 tx hash
+    # 交易送出後狀態為 submitted，收據回來後改為 mined / reverted / dropped
+    def __init__(self, rows: list):
+        self.job_id = uuid.uuid4().hex
+        self.status = "pending"
+        self.lock = threading.Lock()
+        self.receipts = dict()  # tx_hash -> 上鏈結果（收據可能比 mark_submitted 先回來）
+        self.rows = [{"row": i, "status": "pending", "tx_hash": None, "error": None, **row}
+                     for i, row in enumerate(rows)]
+
+    # 更新某一列的結果
+    def update_row(self, index: int, **kwargs):
+        with self.lock:
+            self.rows[index].update(kwargs)
+
+    # 記錄某一列已送出的交易
+    def mark_submitted(self, index: int, tx_hash: str):
+        with self.lock:
+            self.rows[index].update(tx_hash=tx_hash, status=self.receipts.get(tx_hash, "submitted"))
+
+    # receipt_tracker 的 on_mined：以上鏈結果更新使用該交易的所有列
+    def record_receipt(self, record: dict):
+        with self.lock:
+            self.receipts[record["tx_hash"]] = record["status"]
+            for row in self.rows:
+                if row["tx_hash"] == record["tx_hash"]:
+                    row["status"] = record["status"]
+
+    # 取得所有失敗列的原始資料（供重試），取出的列標記為 retried，避免重複重試
+    def failed_rows(self, fields: tuple):
+        with self.lock:
+            rows = [row for row in self.rows if row["status"] == "failed"]
+            for row in rows:
+                row["status"] = "retried"
+            return [{field: row[field] for field in fields} for row in rows]
+
+    # 取得某狀態的所有列（複本）
+    def rows_with_status(self, status: str):
+        with self.lock:
+            return [dict(row) for row in self.rows if row["status"] == status]
+
+    # 取得進度摘要（供 JSON 回傳）
+    def to_dict(self, include_rows: bool = True):
+        with self.lock:
+            counts = dict()
+            for row in self.rows:
+                counts[row["status"]] = counts.get(row["status"], 0) + 1
+            data = {"job_id": self.job_id, "status": self.status,
+                    "total": len(self.rows), "counts": counts}
+            if include_rows:
+                data["rows"] = [dict(row) for row in self.rows]
+            return data
+
+
+class JobRegistry:
+
+    # 初始化 - 只保留最近的若干個工作
+    def __init__(self, max_jobs: int = 100):
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    # 建立工作並在背景執行緒中處理每一列：handler(row, on_mined) 回傳 tx hash
+    def submit(self, rows: list, handler):
+        return self.submit_task(rows, lambda job: self._run_rows(job, handler))
+
+    # 建立工作並在背景執行緒中整批處理：task(job) 自行更新每一列的狀態
+    def submit_task(self, rows: list, task):
+        job = BulkJob(rows)
+        with self.lock:
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > self.max_jobs:
+                self.jobs.popitem(last=False)
+        thread = threading.Thread(target=self._run_task, args=(job, task), daemon=True)
+        thread.start()
+        return job
+
+    # 取得工作
+    def get(self, job_id: str):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    # 執行整批工作
+    def _run_task(self, job: BulkJob, task):
+        job.status = "running"
+        try:
+            task(job)
+            job.status = "finished"
+        except Exception as exc:
+            job.status = "error: " + str(exc)
+
+    # 在單一執行緒中依序連續送出交易，不等待上鏈
+    # 同一工作的交易共用同一把私鑰，依序簽署才能讓 nonce 依序送達節點（舊版 Ganache 不接受亂序 nonce）
+    def _run_rows(self, job: BulkJob, handler):
+        for index, row in enumerate(job.rows):
+            if row["status"] != "pending":
+                continue
+            job.update_row(index, status="submitting")
+            try:
+                tx_hash = handler(row, job.record_receipt)
+                job.mark_submitted(index, tx_hash)
+            except Exception as exc:
+                job.update_row(index, status="failed", error=str(exc))
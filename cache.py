@@ -0,0 +1,69 @@
+# Cache packages
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+
+    # 初始化 - 設定容量上限與存活時間（ttl 為 None 表示不過期）
+    def __init__(self, maxsize: int = 256, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # 取得快取內容，找不到或已過期時回傳 default
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is not None:
+                value, expire_at = entry
+                if expire_at is None or expire_at > time.monotonic():
+                    self.data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.data[key]
+            self.misses += 1
+            return default
+
+    # 寫入快取，超過容量時淘汰最久未使用的項目
+    def put(self, key, value):
+        expire_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self.lock:
+            self.data[key] = (value, expire_at)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    # 移除單一項目
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.data.pop(key, None)
+            return default if entry is None else entry[0]
+
+    # 移除所有符合條件 predicate(key, value) 的項目，回傳移除數量
+    def pop_matching(self, predicate):
+        with self.lock:
+            keys = [key for key, (value, _) in self.data.items() if predicate(key, value)]
+            for key in keys:
+                del self.data[key]
+            return len(keys)
+
+    # 清空快取
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    # 取得命中統計
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {"size": len(self.data), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+    def __len__(self):
+        return len(self.data)
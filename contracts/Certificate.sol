@@ -1,4 +1,5 @@
 pragma solidity >0.0.0;
+pragma experimental ABIEncoderV2;
 
 contract Certificate {
     
@@ -113,6 +114,40 @@ contract Certificate {
         courses.push(Course({ name: name, content: content, comment: comment, grade: grade }));
         emit done(DoneCode.setCourse, "Set Course");
     }
+
+    // 取得某區段的課程資訊（從 start 開始最多 count 筆）
+    function getCourses(uint start, uint count) public view
+        returns(string[] memory, string[] memory, string[] memory, uint8[] memory) {
+        // 不計算 start + count，避免溢位
+        uint size = 0;
+        if(start < courses.length){
+            size = courses.length - start;
+            if(count < size){
+                size = count;
+            }
+        }
+        string[] memory names = new string[](size);
+        string[] memory contents = new string[](size);
+        string[] memory comments = new string[](size);
+        uint8[] memory grades = new uint8[](size);
+        for(uint i = 0; i < size; i++){
+            Course memory course = courses[start + i];
+            names[i] = course.name;
+            contents[i] = course.content;
+            comments[i] = course.comment;
+            grades[i] = course.grade;
+        }
+        return(names, contents, comments, grades);
+    }
+
+    // 一次上傳多筆課程紀錄（每筆課程各發出一個 setCourse 事件）
+    function setCourses(string[] memory names, string[] memory contents, string[] memory comments, uint8[] memory grades) public checkSchool {
+        require(names.length == contents.length && names.length == comments.length && names.length == grades.length, "Length mismatch.");
+        for(uint i = 0; i < names.length; i++){
+            courses.push(Course({ name: names[i], content: contents[i], comment: comments[i], grade: grades[i] }));
+            emit done(DoneCode.setCourse, "Set Course");
+        }
+    }
     
     
     // 檢查是否滿足某證書的條件 (modifier)
@@ -0,0 +1,72 @@
+pragma solidity >0.0.0;
+
+contract CredentialRegistry {
+
+    // 情境：學校將一整批修課紀錄（例如一學期的成績）整理成 Merkle tree，
+    // 鏈上只記錄每一批的 Merkle root，修課紀錄本身保存在鏈下，
+    // 任何人都可以用修課紀錄與 Merkle proof 驗證該紀錄是否包含在某一批之中
+
+    address internal school; // 學校發起合約時的地址
+
+    Batch[] internal batches; // 每一批的 Merkle root
+
+    constructor() public {
+        school = msg.sender;
+    }
+
+    // 批次結構
+    struct Batch {
+        bytes32 root; // Merkle root
+        uint recordCount; // 紀錄筆數
+        uint timestamp; // 上鏈時間
+    }
+
+    // 檢查操作者是否為發起合約的學校
+    modifier checkSchool {
+        require(msg.sender == school, "Not school!");
+        _;
+    }
+
+    // 檢查 Index 長度
+    modifier IndexValidator(uint index, uint max) {
+        require(index < max, "Out of range.");
+        _;
+    }
+
+    // 發布新批次時的事件
+    event rootPublished(uint batchId, bytes32 root, uint recordCount);
+
+    // 發布某一批修課紀錄的 Merkle root
+    function publishRoot(bytes32 root, uint recordCount) public checkSchool returns(uint) {
+        batches.push(Batch({ root: root, recordCount: recordCount, timestamp: now }));
+        emit rootPublished(batches.length - 1, root, recordCount);
+        return batches.length - 1;
+    }
+
+    // 取得批次數量
+    function getBatchCount() public view returns(uint) {
+        return batches.length;
+    }
+
+    // 取得某批次資訊
+    function getBatch(uint batchId) public view IndexValidator(batchId, getBatchCount())
+        returns(bytes32, uint, uint) {
+        Batch memory batch = batches[batchId];
+        return(batch.root, batch.recordCount, batch.timestamp);
+    }
+
+    // 驗證某筆紀錄（leaf）是否包含在某批次中（兩兩排序後雜湊）
+    function verify(uint batchId, bytes32 leaf, bytes32[] memory proof) public view
+        IndexValidator(batchId, getBatchCount()) returns(bool) {
+        bytes32 computed = leaf;
+        for(uint i = 0; i < proof.length; i++){
+            if(computed <= proof[i]){
+                computed = keccak256(abi.encodePacked(computed, proof[i]));
+            } else {
+                computed = keccak256(abi.encodePacked(proof[i], computed));
+            }
+        }
+        return computed == batches[batchId].root;
+    }
+
+}
@@ -0,0 +1,338 @@
+# Database packages
+import time
+import queue
+import json
+import threading
+from contextlib import contextmanager
+import pymysql
+from cache import LRUCache
+
+
+class ConnectionPool:
+
+    # 初始化 - 最多保留 size 條連線，閒置超過 ping_interval 秒的連線在取用前先 ping
+    # cursor_wrapper 可包裝 cursor()（例如記錄查詢次數與耗時）
+    def __init__(self, db_config: dict, size: int = 8, timeout: float = 10.0,
+                 ping_interval: float = 60.0, connect=None, cursor_wrapper=None):
+        self.db_config = db_config
+        self.cursor_wrapper = cursor_wrapper
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.connect = connect or self._connect_mysql
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def _connect_mysql(self):
+        return pymysql.connect(host=self.db_config["host"], user=self.db_config["username"],
+                               password=self.db_config["password"],
+                               database=self.db_config["database"], autocommit=False)
+
+    def _acquire(self):
+        try:
+            connection, last_used = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                can_create = self.created < self.size
+                if can_create:
+                    self.created += 1
+            if can_create:
+                try:
+                    return self.connect()
+                except Exception:
+                    with self.lock:
+                        self.created -= 1
+                    raise
+            connection, last_used = self.idle.get(timeout=self.timeout)
+        if time.monotonic() - last_used > self.ping_interval and hasattr(connection, "ping"):
+            connection.ping(reconnect=True)
+        return connection
+
+    def _discard(self, connection):
+        with self.lock:
+            self.created -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    # 取得一條連線，用完歸還；發生錯誤時 rollback，連線本身出錯則丟棄
+    @contextmanager
+    def connection(self):
+        connection = self._acquire()
+        try:
+            yield connection
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception:
+                self._discard(connection)
+            else:
+                self.idle.put((connection, time.monotonic()))
+            raise
+        self.idle.put((connection, time.monotonic()))
+
+    # 取得 cursor，區塊結束時 commit
+    @contextmanager
+    def cursor(self):
+        with self.connection() as connection:
+            cur = connection.cursor()
+            try:
+                yield cur if self.cursor_wrapper is None else self.cursor_wrapper(cur)
+                connection.commit()
+            finally:
+                cur.close()
+
+
+class StudentDirectory:
+
+    # 初始化 - 學生資料以學號為 key 快取 (name, address, contract_address)
+    def __init__(self, pool: ConnectionPool, cache_size: int = 10000, ttl: float = 60.0):
+        self.pool = pool
+        self.student_cache = LRUCache(cache_size, ttl)
+        self.school_cache = LRUCache(256, ttl * 5)
+
+    # 學生登入驗證
+    def check_student_password(self, student_id: str, password: str):
+        with self.pool.cursor() as cur:
+            command = "SELECT id FROM Student WHERE id = %s AND password = %s"
+            cur.execute(command, (student_id, password))
+            id_list = cur.fetchall()
+        return id_list[0][0] if id_list else None
+
+    # 學校登入驗證
+    def check_school_password(self, school_id: str, password: str):
+        with self.pool.cursor() as cur:
+            command = "SELECT id FROM School WHERE id = %s AND password = %s"
+            cur.execute(command, (school_id, password))
+            id_list = cur.fetchall()
+        return id_list[0][0] if id_list else None
+
+    # 取得學校的 name
+    def get_school_name(self, school_id: str):
+        name = self.school_cache.get(school_id)
+        if name is None:
+            with self.pool.cursor() as cur:
+                command = "SELECT name FROM School WHERE id = %s"
+                cur.execute(command, (school_id, ))
+                name = cur.fetchall()[0][0]
+            self.school_cache.put(school_id, name)
+        return name
+
+    # 以單一查詢取得學生完整資料 (name, address, contract_address)
+    def get_student(self, student_id: str):
+        student = self.student_cache.get(str(student_id))
+        if student is None:
+            with self.pool.cursor() as cur:
+                command = "SELECT name, address, contract_address FROM Student WHERE id = %s"
+                cur.execute(command, (student_id, ))
+                student = tuple(cur.fetchall()[0])
+            self.student_cache.put(str(student_id), student)
+        return student
+
+    # 透過學號取得合約地址
+    def get_contract_address(self, student_id: str):
+        return self.get_student(student_id)[2]
+
+    # 透過學號取得姓名與地址
+    def get_name_and_address(self, student_id: str):
+        name, address, _ = self.get_student(student_id)
+        return name, address
+
+    # 透過多個學號取得合約地址，未快取的學號以單一查詢取得
+    def get_contract_addresses(self, student_ids: list):
+        address_dict = dict()
+        missing = list()
+        for student_id in student_ids:
+            student = self.student_cache.get(str(student_id))
+            if student is None:
+                missing.append(student_id)
+            else:
+                address_dict[str(student_id)] = student[2]
+        if missing:
+            with self.pool.cursor() as cur:
+                placeholders = ", ".join(["%s"] * len(missing))
+                command = ("SELECT id, name, address, contract_address FROM Student WHERE id IN ("
+                           + placeholders + ")")
+                cur.execute(command, tuple(missing))
+                student_list = cur.fetchall()
+            for student_id, name, address, contract_address in student_list:
+                self.student_cache.put(str(student_id), (name, address, contract_address))
+                address_dict[str(student_id)] = contract_address
+        return address_dict
+
+    # 以 keyset 分頁列出學生（依學號排序），回傳 (student_list, 是否還有下一頁)
+    # contract_status: "deployed" 只列出已有合約者、"none" 只列出尚未部署者
+    def list_students(self, after_id: str = None, limit: int = 50, id_prefix: str = None,
+                      name: str = None, contract_status: str = None):
+        conditions = list()
+        params = list()
+        if after_id:
+            conditions.append("id > %s")
+            params.append(after_id)
+        if id_prefix:
+            conditions.append("id LIKE %s")
+            params.append(id_prefix + "%")
+        if name:
+            conditions.append("name LIKE %s")
+            params.append("%" + name + "%")
+        if contract_status == "deployed":
+            conditions.append("contract_address IS NOT NULL AND contract_address <> ''")
+        elif contract_status == "none":
+            conditions.append("(contract_address IS NULL OR contract_address = '')")
+        command = "SELECT id, name, address, contract_address FROM Student"
+        if conditions:
+            command += " WHERE " + " AND ".join(conditions)
+        command += " ORDER BY id LIMIT %s"
+        params.append(limit + 1)
+        with self.pool.cursor() as cur:
+            cur.execute(command, tuple(params))
+            student_list = cur.fetchall()
+        return student_list[:limit], len(student_list) > limit
+
+    # 將合約地址儲存於學生的 table 內
+    def store_contract_address(self, student_address: str, contract_address: str):
+        return self.store_contract_addresses([(student_address, contract_address)])
+
+    # 批次將合約地址儲存於學生的 table 內（單一 transaction），並讓相關快取失效
+    def store_contract_addresses(self, address_pairs: list):
+        try:
+            with self.pool.cursor() as cur:
+                command = "UPDATE Student SET contract_address = %s WHERE address = %s"
+                cur.executemany(command, [(contract_address, student_address)
+                                          for student_address, contract_address in address_pairs])
+        except Exception:
+            return False
+        finally:
+            # MySQL 比對地址時不分大小寫，快取也以小寫比對，避免 checksum 大小寫不同而漏清
+            student_addresses = {student_address.lower() for student_address, _ in address_pairs}
+            self.student_cache.pop_matching(
+                lambda key, value: (value[1] or "").lower() in student_addresses)
+        return True
+
+    # 取得快取命中統計
+    def cache_stats(self):
+        return {"student": self.student_cache.stats(), "school": self.school_cache.stats()}
+
+
+class CredentialStore:
+
+    # 初始化 - Merkle root 模式下的鏈下修課紀錄與其 proof
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.created = False
+
+    def _create_tables(self):
+        if self.created:
+            return
+        with self.pool.cursor() as cur:
+            cur.execute("""CREATE TABLE IF NOT EXISTS CredentialBatch (
+                id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                registry_address VARCHAR(42) NOT NULL,
+                root VARCHAR(66) NOT NULL,
+                tx_hash VARCHAR(66) NULL,
+                chain_batch_id INT NULL,
+                record_count INT NOT NULL
+            )""")
+            cur.execute("""CREATE TABLE IF NOT EXISTS CredentialRecord (
+                batch_id INT NOT NULL,
+                leaf_index INT NOT NULL,
+                student_id VARCHAR(64) NOT NULL,
+                course_name TEXT NOT NULL,
+                content TEXT NOT NULL,
+                comment TEXT NOT NULL,
+                grade TINYINT UNSIGNED NOT NULL,
+                leaf VARCHAR(66) NOT NULL,
+                proof TEXT NOT NULL,
+                PRIMARY KEY (batch_id, leaf_index),
+                KEY (student_id)
+            )""")
+        self.created = True
+
+    # 儲存一整批紀錄與每筆的 proof，回傳本地 batch id
+    def save_batch(self, registry_address: str, tree, proofs: list):
+        self._create_tables()
+        with self.pool.cursor() as cur:
+            cur.execute("INSERT INTO CredentialBatch (registry_address, root, record_count) "
+                        "VALUES (%s, %s, %s)", (registry_address, tree.root.hex(), len(tree)))
+            batch_id = cur.lastrowid
+            cur.executemany(
+                "INSERT INTO CredentialRecord (batch_id, leaf_index, student_id, course_name, content, "
+                "comment, grade, leaf, proof) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                [(batch_id, index, record["student_id"], record["course_name"], record["content"],
+                  record["comment"], int(record["grade"]), tree.leaves[index].hex(), json.dumps(proof))
+                 for index, (record, proof) in enumerate(zip(tree.records, proofs))])
+        return batch_id
+
+    # 記錄發布 root 的交易
+    def set_tx_hash(self, batch_id: int, tx_hash: str):
+        self._create_tables()
+        with self.pool.cursor() as cur:
+            cur.execute("UPDATE CredentialBatch SET tx_hash = %s WHERE id = %s", (tx_hash, batch_id))
+
+    # root 上鏈後記錄鏈上的 batch id
+    def set_chain_batch_id(self, batch_id: int, chain_batch_id: int):
+        self._create_tables()
+        with self.pool.cursor() as cur:
+            cur.execute("UPDATE CredentialBatch SET chain_batch_id = %s WHERE id = %s",
+                        (chain_batch_id, batch_id))
+
+    # 取得某學生所有已上鏈批次中的紀錄與 proof
+    def get_student_credentials(self, student_id: str):
+        self._create_tables()
+        with self.pool.cursor() as cur:
+            cur.execute(
+                "SELECT b.registry_address, b.chain_batch_id, b.root, r.course_name, r.content, r.comment, "
+                "r.grade, r.leaf, r.proof FROM CredentialRecord r JOIN CredentialBatch b ON r.batch_id = b.id "
+                "WHERE r.student_id = %s AND b.chain_batch_id IS NOT NULL ORDER BY b.id, r.leaf_index",
+                (student_id, ))
+            res_list = cur.fetchall()
+        return [{"registry_address": registry_address, "batch_id": chain_batch_id, "root": root,
+                 "record": {"student_id": student_id, "course_name": course_name, "content": content,
+                            "comment": comment, "grade": grade},
+                 "leaf": leaf, "proof": json.loads(proof)}
+                for registry_address, chain_batch_id, root, course_name, content, comment, grade, leaf, proof
+                in res_list]
+
+
+class PendingDeployStore:
+
+    # 初始化 - 已送出但合約地址尚未寫回 Student 的部署交易，程式重新啟動後據此補寫
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.created = False
+
+    def _create_tables(self):
+        if self.created:
+            return
+        with self.pool.cursor() as cur:
+            cur.execute("""CREATE TABLE IF NOT EXISTS PendingDeploy (
+                tx_hash VARCHAR(66) NOT NULL PRIMARY KEY,
+                student_address VARCHAR(42) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )""")
+        self.created = True
+
+    # 記錄已送出的部署交易 [(tx_hash, student_address)]
+    def add(self, pairs: list):
+        if not pairs:
+            return
+        self._create_tables()
+        with self.pool.cursor() as cur:
+            cur.executemany("REPLACE INTO PendingDeploy (tx_hash, student_address) VALUES (%s, %s)", pairs)
+
+    # 合約地址已寫回（或交易失敗）後移除
+    def remove(self, tx_hashes: list):
+        if not tx_hashes:
+            return
+        self._create_tables()
+        with self.pool.cursor() as cur:
+            cur.executemany("DELETE FROM PendingDeploy WHERE tx_hash = %s", [(tx_hash, ) for tx_hash in tx_hashes])
+
+    # 取得所有尚未寫回的部署交易 [(tx_hash, student_address)]
+    def list(self):
+        self._create_tables()
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT tx_hash, student_address FROM PendingDeploy ORDER BY created_at")
+            return [tuple(each) for each in cur.fetchall()]
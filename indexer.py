@@ -0,0 +1,274 @@
+# Indexer packages
+import threading
+import pymysql
+from web3 import Web3
+
+
+# 學籍狀態（與合約 getEducationStatus 的回傳字串一致）
+EDUCATION_STATUS = ["undergraduate", "learing", "graduate"]
+
+# DoneCode 中需要處理的事件代碼
+DONE_SET_COURSE = 0
+DONE_SET_CERTIFICATE = 1
+DONE_SET_EDUCATION_STATUS = 7
+
+CREATE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS IndexedCourse (
+        contract_address VARCHAR(42) NOT NULL,
+        block_number BIGINT NOT NULL,
+        tx_hash VARCHAR(66) NOT NULL,
+        log_index INT NOT NULL,
+        name TEXT NOT NULL,
+        content TEXT NOT NULL,
+        comment TEXT NOT NULL,
+        grade TINYINT UNSIGNED NOT NULL,
+        PRIMARY KEY (tx_hash, log_index),
+        KEY (contract_address, block_number, log_index),
+        KEY (block_number)
+    )""",
+    """CREATE TABLE IF NOT EXISTS IndexedEducationStatus (
+        contract_address VARCHAR(42) NOT NULL,
+        block_number BIGINT NOT NULL,
+        tx_hash VARCHAR(66) NOT NULL,
+        log_index INT NOT NULL,
+        education_status VARCHAR(16) NOT NULL,
+        PRIMARY KEY (tx_hash, log_index),
+        KEY (contract_address, block_number, log_index),
+        KEY (block_number)
+    )""",
+    """CREATE TABLE IF NOT EXISTS IndexedEligibility (
+        contract_address VARCHAR(42) NOT NULL PRIMARY KEY,
+        block_number BIGINT NOT NULL,
+        check_finish BOOLEAN NOT NULL,
+        KEY (block_number)
+    )""",
+    """CREATE TABLE IF NOT EXISTS IndexerFallback (
+        contract_address VARCHAR(42) NOT NULL PRIMARY KEY,
+        block_number BIGINT NOT NULL,
+        KEY (block_number)
+    )""",
+    """CREATE TABLE IF NOT EXISTS IndexerBlock (
+        block_number BIGINT NOT NULL PRIMARY KEY,
+        block_hash VARCHAR(66) NOT NULL
+    )""",
+]
+
+
+class EventIndexer:
+
+    # 初始化 - 背景追蹤新區塊，將 done 事件與其交易內容寫入本地資料表
+    def __init__(self, blockchain, db_config: dict, poll_interval: float = 2.0,
+                 batch_size: int = 500, max_lag: int = 2, keep_blocks: int = 128):
+        self.blockchain = blockchain
+        self.db_config = db_config
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_lag = max_lag
+        self.keep_blocks = keep_blocks
+        self.done_topic = Web3.keccak(text="done(uint8,string)").hex()
+        self.checkpoint = None
+        self.chain_head = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    # 啟動背景執行緒
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    # 停止背景執行緒
+    def stop(self):
+        self.stop_event.set()
+
+    # 本地資料是否已追上鏈上最新區塊（落後不超過 max_lag）
+    def is_synced(self):
+        if self.checkpoint is None or self.chain_head is None:
+            return False
+        return self.chain_head - self.checkpoint <= self.max_lag
+
+    def _connect(self):
+        return pymysql.connect(host=self.db_config["host"], user=self.db_config["username"],
+                               password=self.db_config["password"],
+                               database=self.db_config["database"], autocommit=False)
+
+    def _run(self):
+        connection = None
+        while not self.stop_event.is_set():
+            try:
+                if connection is None:
+                    connection = self._connect()
+                    self._create_tables(connection)
+                self.sync_once(connection)
+            except Exception as exc:
+                print("Indexer error:", exc)
+                if connection is not None:
+                    connection.close()
+                connection = None
+            self.stop_event.wait(self.poll_interval)
+
+    def _create_tables(self, connection):
+        with connection.cursor() as cur:
+            for command in CREATE_TABLES:
+                cur.execute(command)
+        connection.commit()
+
+    # 執行一次同步：先檢查分叉，再逐段處理新區塊
+    def sync_once(self, connection):
+        w3 = self.blockchain.w3
+        self.chain_head = w3.eth.blockNumber
+        checkpoint = self._handle_reorg(connection)
+        while checkpoint < self.chain_head and not self.stop_event.is_set():
+            from_block = checkpoint + 1
+            to_block = min(from_block + self.batch_size - 1, self.chain_head)
+            self._index_range(connection, from_block, to_block)
+            checkpoint = to_block
+            self.checkpoint = checkpoint
+
+    # 比對已記錄的區塊 hash，發生分叉時回滾到共同祖先，回傳目前 checkpoint
+    def _handle_reorg(self, connection):
+        w3 = self.blockchain.w3
+        with connection.cursor() as cur:
+            cur.execute("SELECT block_number, block_hash FROM IndexerBlock ORDER BY block_number DESC")
+            recorded_blocks = cur.fetchall()
+        fork_point = -1
+        for block_number, block_hash in recorded_blocks:
+            block = w3.eth.getBlock(block_number)
+            if block is not None and block["hash"].hex() == block_hash:
+                fork_point = block_number
+                break
+        if recorded_blocks and fork_point != recorded_blocks[0][0]:
+            print("Indexer reorg detected, rollback to block", fork_point)
+            with connection.cursor() as cur:
+                for table in ("IndexedCourse", "IndexedEducationStatus", "IndexedEligibility",
+                              "IndexerFallback", "IndexerBlock"):
+                    cur.execute("DELETE FROM " + table + " WHERE block_number > %s", (fork_point, ))
+            connection.commit()
+        self.checkpoint = fork_point
+        return fork_point
+
+    # 處理一段區塊範圍內的 done 事件，並於同一個 transaction 內更新 checkpoint
+    # 無法由交易內容還原的事件（例如經由 proxy / multisig 呼叫 setCourse），該合約改為直接查鏈上
+    def _index_range(self, connection, from_block: int, to_block: int):
+        w3 = self.blockchain.w3
+        logs = w3.eth.getLogs({"fromBlock": from_block, "toBlock": to_block,
+                               "topics": [self.done_topic]})
+        transactions = self._get_transactions({log["transactionHash"].hex() for log in logs})
+        course_rows = list()
+        status_rows = list()
+        fallback_rows = dict()  # contract_address -> 第一個無法解析的事件所在區塊
+        course_positions = dict()  # setCourses 交易中已處理的課程數
+        for log in logs:
+            try:
+                self._decode_log(log, transactions, course_positions, course_rows, status_rows)
+            except Exception as exc:
+                print("Indexer cannot decode log", log["transactionHash"].hex(), log["logIndex"], exc)
+                fallback_rows.setdefault(log["address"], log["blockNumber"])
+        eligibility_rows = self._get_eligibility({row[0] for row in course_rows} - set(fallback_rows), to_block)
+        block_hash = w3.eth.getBlock(to_block)["hash"].hex()
+        with connection.cursor() as cur:
+            if course_rows:
+                cur.executemany(
+                    "INSERT IGNORE INTO IndexedCourse (contract_address, block_number, tx_hash, log_index, "
+                    "name, content, comment, grade) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", course_rows)
+            if status_rows:
+                cur.executemany(
+                    "INSERT IGNORE INTO IndexedEducationStatus (contract_address, block_number, tx_hash, "
+                    "log_index, education_status) VALUES (%s, %s, %s, %s, %s)", status_rows)
+            if eligibility_rows:
+                cur.executemany(
+                    "REPLACE INTO IndexedEligibility (contract_address, block_number, check_finish) "
+                    "VALUES (%s, %s, %s)", eligibility_rows)
+            if fallback_rows:
+                cur.executemany(
+                    "INSERT IGNORE INTO IndexerFallback (contract_address, block_number) VALUES (%s, %s)",
+                    list(fallback_rows.items()))
+            cur.execute("REPLACE INTO IndexerBlock (block_number, block_hash) VALUES (%s, %s)",
+                        (to_block, block_hash))
+            cur.execute("DELETE FROM IndexerBlock WHERE block_number < %s",
+                        (to_block - self.keep_blocks, ))
+        connection.commit()
+
+    # 解析單一 done 事件，將對應的課程或學籍狀態加入 course_rows / status_rows
+    def _decode_log(self, log, transactions: dict, course_positions: dict, course_rows: list, status_rows: list):
+        event = self.blockchain.contract_factory.events.done().processLog(log)
+        event_code = event["args"]["eventCode"]
+        row = (log["address"], log["blockNumber"], log["transactionHash"].hex(), log["logIndex"])
+        if event_code == DONE_SET_CERTIFICATE:
+            status_rows.append(row + ("graduate", ))
+            return
+        if event_code not in (DONE_SET_COURSE, DONE_SET_EDUCATION_STATUS):
+            return
+        transaction = transactions.get(log["transactionHash"].hex())
+        if transaction is None:
+            raise ValueError("transaction not found")
+        if transaction["to"] is None or Web3.toChecksumAddress(transaction["to"]) != log["address"]:
+            raise ValueError("event emitted by an internal call")
+        function, params = self.blockchain.contract_factory.decode_function_input(transaction["input"])
+        if event_code == DONE_SET_COURSE and function.fn_name == "setCourses":
+            # 同一筆交易中的第 k 個 setCourse 事件對應陣列中的第 k 筆課程
+            position = course_positions.get(row[2], 0)
+            course_positions[row[2]] = position + 1
+            course_rows.append(row + (params["names"][position], params["contents"][position],
+                                      params["comments"][position], params["grades"][position]))
+        elif event_code == DONE_SET_COURSE:
+            course_rows.append(row + (params["name"], params["content"],
+                                      params["comment"], params["grade"]))
+        else:
+            status_rows.append(row + (EDUCATION_STATUS[params["newEducationStatus"]], ))
+
+    # 以 JSON-RPC batch 在 to_block 查詢課程有變動的合約是否滿足畢業條件（由合約 checkFinishCertificate 判斷）
+    # 回傳 [(contract_address, block_number, check_finish)]，查詢失敗的合約不寫入（讀取時改查鏈上）
+    def _get_eligibility(self, contract_addresses: set, to_block: int):
+        if not contract_addresses:
+            return list()
+        contract_addresses = sorted(contract_addresses)
+        results = self.blockchain.batch_call(
+            [(contract_address, "checkFinishCertificate", []) for contract_address in contract_addresses],
+            raise_errors=False, block_number=to_block)
+        return [(contract_address, to_block, check_finish)
+                for contract_address, check_finish in zip(contract_addresses, results)
+                if not isinstance(check_finish, Exception)]
+
+    # 以 JSON-RPC batch 一次取得多筆交易內容
+    def _get_transactions(self, tx_hashes: set):
+        tx_hashes = list(tx_hashes)
+        if not tx_hashes:
+            return dict()
+        payload = [{"jsonrpc": "2.0", "id": i, "method": "eth_getTransactionByHash", "params": [tx_hash]}
+                   for i, tx_hash in enumerate(tx_hashes)]
+        responses = self.blockchain.batch_request(payload)
+        return {tx_hash: responses[i]["result"] for i, tx_hash in enumerate(tx_hashes)
+                if responses.get(i, dict()).get("result")}
+
+
+# 查詢某合約的本地課程紀錄（依上鏈順序排列）
+def get_indexed_courses(cur, contract_address: str):
+    command = ("SELECT name, content, comment, grade FROM IndexedCourse WHERE contract_address = %s "
+               "ORDER BY block_number, log_index")
+    cur.execute(command, (Web3.toChecksumAddress(contract_address), ))
+    return [list(course_info) for course_info in cur.fetchall()]
+
+
+# 查詢某合約的本地學籍狀態（沒有事件時即為建構時的在學中）
+def get_indexed_education_status(cur, contract_address: str):
+    command = ("SELECT education_status FROM IndexedEducationStatus WHERE contract_address = %s "
+               "ORDER BY block_number DESC, log_index DESC LIMIT 1")
+    cur.execute(command, (Web3.toChecksumAddress(contract_address), ))
+    res_list = cur.fetchall()
+    return res_list[0][0] if res_list else EDUCATION_STATUS[1]
+
+
+# 查詢某合約在本地記錄的畢業條件（尚未記錄時回傳 None，由呼叫端查鏈上）
+def get_indexed_eligibility(cur, contract_address: str):
+    command = "SELECT check_finish FROM IndexedEligibility WHERE contract_address = %s"
+    cur.execute(command, (Web3.toChecksumAddress(contract_address), ))
+    res_list = cur.fetchall()
+    return bool(res_list[0][0]) if res_list else None
+
+
+# 某合約是否有無法由交易內容還原的事件（此時本地資料不完整，需直接查鏈上）
+def is_indexer_fallback(cur, contract_address: str):
+    command = "SELECT 1 FROM IndexerFallback WHERE contract_address = %s"
+    cur.execute(command, (Web3.toChecksumAddress(contract_address), ))
+    return bool(cur.fetchall())
@@ -0,0 +1,65 @@
+# Merkle tree packages
+from eth_abi import encode_abi
+from web3 import Web3
+
+
+# 修課紀錄的欄位與 ABI 型別（leaf 的編碼方式需與驗證端一致）
+RECORD_FIELDS = ("student_id", "course_name", "content", "comment", "grade")
+RECORD_TYPES = ("string", "string", "string", "string", "uint8")
+
+
+# 計算某筆修課紀錄的 leaf（對 ABI 編碼做兩次 keccak256，避免與內部節點混淆）
+# 使用 abi.encode 而非 packed 編碼：字串各自帶長度，相鄰欄位不會因切分位置不同而得到相同的 leaf
+def hash_record(record: dict):
+    values = [str(record[field]) if field != "grade" else int(record[field]) for field in RECORD_FIELDS]
+    return Web3.keccak(Web3.keccak(encode_abi(list(RECORD_TYPES), values)))
+
+
+# 兩個節點排序後相接再雜湊（與 CredentialRegistry.verify 相同）
+def hash_pair(left: bytes, right: bytes):
+    if left > right:
+        left, right = right, left
+    return Web3.keccak(left + right)
+
+
+# 驗證 leaf 與 proof 是否能算出 root
+def verify_proof(leaf: bytes, proof: list, root: bytes):
+    computed = bytes(leaf)
+    for sibling in proof:
+        computed = hash_pair(computed, bytes(sibling))
+    return computed == bytes(root)
+
+
+class MerkleTree:
+
+    # 初始化 - 由修課紀錄建立整棵樹（奇數節點直接晉升到上一層）
+    def __init__(self, records: list):
+        if not records:
+            raise ValueError("Empty batch")
+        self.records = list(records)
+        self.leaves = [hash_record(record) for record in self.records]
+        self.levels = [self.leaves]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            parent = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2 == 1:
+                parent.append(level[-1])
+            self.levels.append(parent)
+
+    # Merkle root
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    # 取得第 index 筆紀錄的 proof（由下往上的兄弟節點）
+    def get_proof(self, index: int):
+        proof = list()
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                proof.append(level[sibling])
+            index //= 2
+        return proof
+
+    def __len__(self):
+        return len(self.leaves)
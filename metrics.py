@@ -0,0 +1,310 @@
+# Metrics packages
+import re
+import time
+import bisect
+import inspect
+import functools
+import threading
+from flask import request
+
+
+# 延遲 histogram 的區間（秒）
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 單次 request 的 RPC / SQL 次數 histogram 區間（用來找出 N+1 的頁面）
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# 由 SQL 取出資料表名稱作為 label（避免把整段 SQL 當成 label）
+SQL_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE|EXISTS)\s+`?(\w+)", re.IGNORECASE)
+
+
+class Histogram:
+
+    # 初始化 - 每個區間各自計數，輸出時再累加成 Prometheus 的累積格式
+    def __init__(self, buckets: tuple):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Profile:
+
+    # 初始化 - 單一 request 內的鏈上呼叫、RPC 與 SQL 統計
+    def __init__(self, rpc_before: int = 0):
+        self.start = time.perf_counter()
+        self.rpc_before = rpc_before
+        self.depth = 0
+        self.chain_calls = 0
+        self.chain_time = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+
+    # 目前為止的耗時（秒）
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+class TimedCursor:
+
+    # 初始化 - 包裝 DB-API cursor，記錄每次 execute 的次數與耗時
+    def __init__(self, cursor, metrics):
+        self.cursor = cursor
+        self.metrics = metrics
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return self.cursor.execute(query, args)
+        finally:
+            self.metrics.record_query(query, time.perf_counter() - start)
+
+    def executemany(self, query, args):
+        start = time.perf_counter()
+        try:
+            return self.cursor.executemany(query, args)
+        finally:
+            self.metrics.record_query(query, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class Metrics:
+
+    # 初始化 - histogram / counter 以 (名稱, labels) 為 key，輸出時另外呼叫 collector 取得即時數值
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = dict()
+        self.counters = dict()
+        self.descriptions = dict()  # 名稱 -> (type, help)
+        self.collectors = list()
+        self.local = threading.local()
+        self.describe("http_request_duration_seconds", "histogram", "Request latency by route")
+        self.describe("http_request_rpc_calls", "histogram", "Chain RPC round trips per request")
+        self.describe("http_request_db_queries", "histogram", "SQL queries per request")
+        self.describe("chain_call_duration_seconds", "histogram", "Blockchain method latency")
+        self.describe("chain_call_errors_total", "counter", "Blockchain method calls that raised")
+        self.describe("db_query_duration_seconds", "histogram", "SQL query latency by operation and table")
+
+    # 設定指標的型別與說明
+    def describe(self, name: str, kind: str, text: str):
+        self.descriptions[name] = (kind, text)
+
+    # 記錄一筆 histogram 數值
+    def observe(self, name: str, labels: dict, value: float, buckets: tuple = LATENCY_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    # counter 累加
+    def inc(self, name: str, labels: dict, value: float = 1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    # 註冊 collector：回傳 [(名稱, type, help, [(labels, 數值)])]，於輸出 /metrics 時呼叫
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    # 目前執行緒（request）的 profile，不在 request 內時為 None
+    def current_profile(self):
+        return getattr(self.local, "profile", None)
+
+    # 包裝物件的公開方法，記錄每個方法的呼叫次數與耗時
+    # 巢狀呼叫（例如 get_courses 內的 batch_call）各自計入，request profile 只計最外層
+    def instrument(self, obj, component: str, exclude: tuple = ()):
+        for name, method in inspect.getmembers(obj, inspect.ismethod):
+            if name.startswith("_") or name in exclude:
+                continue
+            if inspect.iscoroutinefunction(method):
+                setattr(obj, name, self._wrap_coroutine(method, component, name))
+            else:
+                setattr(obj, name, self._wrap(method, component, name))
+        return obj
+
+    def _wrap(self, method, component: str, name: str):
+        labels = {"component": component, "method": name}
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            profile = self.current_profile()
+            if profile is not None:
+                profile.depth += 1
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            except Exception:
+                self.inc("chain_call_errors_total", labels)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.observe("chain_call_duration_seconds", labels, elapsed)
+                if profile is not None:
+                    profile.depth -= 1
+                    if profile.depth == 0:
+                        profile.chain_calls += 1
+                        profile.chain_time += elapsed
+        return wrapper
+
+    # coroutine 在 event loop 執行緒上執行，只記錄全域統計（request 耗時由呼叫端的 run 計入）
+    def _wrap_coroutine(self, method, component: str, name: str):
+        labels = {"component": component, "method": name}
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            except Exception:
+                self.inc("chain_call_errors_total", labels)
+                raise
+            finally:
+                self.observe("chain_call_duration_seconds", labels, time.perf_counter() - start)
+        return wrapper
+
+    # 包裝 cursor（供 ConnectionPool 使用）
+    def wrap_cursor(self, cursor):
+        return TimedCursor(cursor, self)
+
+    # 記錄一次 SQL 查詢
+    def record_query(self, query: str, elapsed: float):
+        words = query.split(None, 1)
+        match = SQL_TABLE_PATTERN.search(query)
+        labels = {"operation": words[0].upper() if words else "",
+                  "table": match.group(1) if match else ""}
+        self.observe("db_query_duration_seconds", labels, elapsed)
+        profile = self.current_profile()
+        if profile is not None:
+            profile.db_queries += 1
+            profile.db_time += elapsed
+
+    # 掛上 Flask hook：記錄每個 route 的延遲、RPC 次數與 SQL 次數
+    # rpc_counter 回傳目前執行緒累計的 RPC 次數；request 帶有 profile_header 時回傳 Server-Timing
+    def init_app(self, app, rpc_counter=None, profile_header: str = "X-Profile"):
+        rpc_counter = rpc_counter or (lambda: 0)
+
+        @app.before_request
+        def start_profile():
+            self.local.profile = Profile(rpc_counter())
+
+        @app.after_request
+        def finish_profile(response):
+            profile = self.current_profile()
+            if profile is None:
+                return response
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            method = request.method
+            status = str(response.status_code)
+            if profile_header and request.headers.get(profile_header):
+                response.headers["Server-Timing"] = self.server_timing(profile, rpc_counter())
+
+            # 串流回應在 body 送完後才記錄，延遲才會包含整段輸出
+            def record():
+                rpc_calls = rpc_counter() - profile.rpc_before
+                self.observe("http_request_duration_seconds",
+                             {"route": route, "method": method, "status": status}, profile.elapsed())
+                self.observe("http_request_rpc_calls", {"route": route}, rpc_calls, COUNT_BUCKETS)
+                self.observe("http_request_db_queries", {"route": route}, profile.db_queries, COUNT_BUCKETS)
+                self.local.profile = None
+            response.call_on_close(record)
+            return response
+
+        @app.route("/metrics", methods=["GET"])
+        def metrics():
+            return app.response_class(self.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    # 組成 Server-Timing header（dur 以毫秒為單位）
+    @staticmethod
+    def server_timing(profile: Profile, rpc_count: int):
+        rpc_calls = rpc_count - profile.rpc_before
+        return ", ".join([
+            'chain;dur=%.2f;desc="%d calls, %d rpc"' % (profile.chain_time * 1000, profile.chain_calls, rpc_calls),
+            'db;dur=%.2f;desc="%d queries"' % (profile.db_time * 1000, profile.db_queries),
+            'total;dur=%.2f' % (profile.elapsed() * 1000),
+        ])
+
+    # 輸出 Prometheus text format
+    def render(self):
+        families = dict()
+        with self.lock:
+            for (name, labels), histogram in self.histograms.items():
+                families.setdefault(name, ("histogram", list()))[1].append(
+                    (labels, (histogram.buckets, list(histogram.counts), histogram.count, histogram.sum)))
+            for (name, labels), value in self.counters.items():
+                families.setdefault(name, ("counter", list()))[1].append((labels, value))
+        for collector in self.collectors:
+            for name, kind, text, samples in collector():
+                self.descriptions.setdefault(name, (kind, text))
+                families.setdefault(name, (kind, list()))[1].extend(
+                    (tuple(sorted(labels.items())), value) for labels, value in samples)
+
+        lines = list()
+        for name in sorted(families):
+            kind, samples = families[name]
+            text = self.descriptions.get(name, (kind, ""))[1]
+            if text:
+                lines.append("# HELP %s %s" % (name, text))
+            lines.append("# TYPE %s %s" % (name, kind))
+            for labels, value in samples:
+                if kind != "histogram":
+                    lines.append("%s%s %s" % (name, format_labels(labels), format_value(value)))
+                    continue
+                buckets, counts, count, total = value
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + (float("inf"), ), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else format_value(bound)
+                    lines.append("%s_bucket%s %d" % (name, format_labels(labels + (("le", le), )), cumulative))
+                lines.append("%s_sum%s %s" % (name, format_labels(labels), format_value(total)))
+                lines.append("%s_count%s %d" % (name, format_labels(labels), count))
+        return "\n".join(lines) + "\n"
+
+
+# 將 cache_stats() 的巢狀結果轉成 collector 格式（有 hits 欄位的 dict 視為一個快取）
+def cache_samples(stats: dict, prefix: str = ""):
+    caches = list()
+
+    def walk(name, value):
+        if not isinstance(value, dict):
+            return
+        if "hits" in value:
+            caches.append((name, value))
+            return
+        for key, child in value.items():
+            walk(name + "." + key if name else key, child)
+    walk(prefix, stats)
+
+    return [
+        ("cache_hits_total", "counter", "Cache hits", [({"cache": name}, value["hits"]) for name, value in caches]),
+        ("cache_misses_total", "counter", "Cache misses",
+         [({"cache": name}, value["misses"]) for name, value in caches]),
+        ("cache_hit_ratio", "gauge", "Cache hit ratio since start",
+         [({"cache": name}, value["hit_rate"]) for name, value in caches]),
+        ("cache_entries", "gauge", "Entries currently cached",
+         [({"cache": name}, value["size"]) for name, value in caches]),
+    ]
+
+
+def format_labels(labels: tuple):
+    if not labels:
+        return ""
+    escaped = ['%s="%s"' % (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+               for key, value in labels]
+    return "{" + ",".join(escaped) + "}"
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
@@ -0,0 +1,77 @@
+# Nonce packages
+import heapq
+import threading
+
+
+class NonceManager:
+
+    # 初始化 - 每個帳戶維護下一個可用 nonce、已送出未確認的交易與可回收的 nonce
+    def __init__(self, w3):
+        self.w3 = w3
+        self.lock = threading.Lock()
+        self.next_nonce = dict()  # address -> 下一個 nonce
+        self.reserved = dict()  # address -> 已分配、尚在建立或簽署中的 nonce
+        self.pending = dict()  # address -> {nonce: tx_hash}
+        self.released = dict()  # address -> 未被使用、可再分配的 nonce (min-heap)
+
+    # 分配 nonce（執行緒安全），優先補回先前送出失敗而空出的 nonce
+    # 分配出去的 nonce 在送出或歸還之前都記為 reserved，resync 不會把它再分配給其他交易
+    def allocate(self, address: str):
+        with self.lock:
+            if address not in self.next_nonce:
+                self.next_nonce[address] = self.w3.eth.getTransactionCount(address, "pending")
+                self.pending.setdefault(address, dict())
+                self.released.setdefault(address, list())
+            reserved = self.reserved.setdefault(address, set())
+            if self.released[address]:
+                nonce = heapq.heappop(self.released[address])
+            else:
+                nonce = self.next_nonce[address]
+                self.next_nonce[address] = nonce + 1
+            reserved.add(nonce)
+            return nonce
+
+    # 交易已送出，由 reserved 改記為 pending
+    def mark_sent(self, address: str, nonce: int, tx_hash: str):
+        with self.lock:
+            self.reserved.get(address, set()).discard(nonce)
+            self.pending.setdefault(address, dict())[nonce] = tx_hash
+
+    # 交易已上鏈，移出 pending
+    def confirm(self, address: str, nonce: int):
+        with self.lock:
+            self.reserved.get(address, set()).discard(nonce)
+            self.pending.get(address, dict()).pop(nonce, None)
+
+    # 交易沒有送出成功，歸還 nonce 讓下一筆交易補上空缺
+    def release(self, address: str, nonce: int):
+        with self.lock:
+            self.reserved.get(address, set()).discard(nonce)
+            released = self.released.setdefault(address, list())
+            if nonce < self.next_nonce.get(address, 0) and nonce not in released:
+                heapq.heappush(released, nonce)
+
+    # 與節點重新同步，處理外部送出的交易或 nonce 空缺
+    def resync(self, address: str):
+        with self.lock:
+            mined_count = self.w3.eth.getTransactionCount(address, "latest")
+            pending_count = self.w3.eth.getTransactionCount(address, "pending")
+            pending = self.pending.setdefault(address, dict())
+            reserved = self.reserved.setdefault(address, set())
+            # 已上鏈的交易不再追蹤
+            for nonce in [nonce for nonce in pending if nonce < mined_count]:
+                del pending[nonce]
+            # 以節點為準補上空缺，但不可回退到任何仍在建立、簽署或在途中的 nonce 之前
+            in_flight = reserved | set(pending)
+            next_nonce = max([pending_count] + [nonce + 1 for nonce in in_flight])
+            self.next_nonce[address] = next_nonce
+            self.released[address] = [
+                nonce for nonce in self.released.get(address, list())
+                if pending_count <= nonce < next_nonce and nonce not in in_flight]
+            heapq.heapify(self.released[address])
+            return next_nonce
+
+    # 取得某帳戶目前在途中的交易
+    def get_pending(self, address: str):
+        with self.lock:
+            return dict(self.pending.get(address, dict()))
@@ -0,0 +1,179 @@
+# Provider pool packages
+import time
+import itertools
+import threading
+import requests
+import yaml
+from web3.providers.base import JSONBaseProvider
+
+
+# 必須送到主節點的 RPC（寫入、nonce 與自己送出的交易狀態）
+PRIMARY_METHODS = {
+    "eth_sendRawTransaction",
+    "eth_sendTransaction",
+    "eth_getTransactionCount",
+    "eth_getTransactionByHash",
+    "eth_getTransactionReceipt",
+}
+
+# 節點尚未同步到指定區塊時回傳的錯誤訊息（geth: header not found；其他客戶端: unknown block / block not found）
+UNKNOWN_BLOCK_ERRORS = ("header not found", "unknown block", "block not found")
+
+
+class Node:
+
+    # 初始化 - 單一節點的連線、延遲（EWMA）與健康狀態
+    def __init__(self, url: str, role: str = "replica", timeout: float = 10.0):
+        self.url = url
+        self.role = role
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.latency = None
+        self.healthy = True
+        self.block_number = None
+        self.failures = 0
+
+    # 送出 JSON-RPC 請求（單筆或 batch），並更新延遲
+    def post(self, payload):
+        start = time.monotonic()
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        self.observe(time.monotonic() - start)
+        return response.json()
+
+    # 以指數移動平均記錄延遲
+    def observe(self, latency: float):
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+    def to_dict(self):
+        return {"url": self.url, "role": self.role, "healthy": self.healthy,
+                "latency": self.latency, "block_number": self.block_number, "failures": self.failures}
+
+
+class ProviderPool(JSONBaseProvider):
+
+    # 初始化 - 讀取依延遲分散到健康節點，寫入固定送到主節點，主節點失效時改由下一個可寫入節點接手
+    def __init__(self, nodes: list, health_check_interval: float = 5.0, max_block_lag: int = 2,
+                 max_failures: int = 3):
+        super().__init__()
+        if not nodes:
+            raise ValueError("No blockchain node configured")
+        self.nodes = nodes
+        self.health_check_interval = health_check_interval
+        self.max_block_lag = max_block_lag
+        self.max_failures = max_failures
+        self.request_counter = itertools.count()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    # 由 YAML 設定檔建立
+    @classmethod
+    def from_config(cls, path: str):
+        with open(path, 'r') as stream:
+            config = yaml.safe_load(stream)
+        timeout = config.get("timeout", 10.0)
+        nodes = [Node(each["url"], each.get("role", "replica"), each.get("timeout", timeout))
+                 for each in config["nodes"]]
+        return cls(nodes, health_check_interval=config.get("health_check_interval", 5.0),
+                   max_block_lag=config.get("max_block_lag", 2), max_failures=config.get("max_failures", 3))
+
+    # 啟動背景健康檢查
+    def start(self):
+        with self.lock:
+            if self.thread is None and self.health_check_interval:
+                self.thread = threading.Thread(target=self._run_health_check, daemon=True)
+                self.thread.start()
+
+    def _run_health_check(self):
+        while True:
+            self.check_health()
+            time.sleep(self.health_check_interval)
+
+    # 以 eth_blockNumber 檢查各節點：連線失敗或區塊落後過多者暫時不分配讀取
+    def check_health(self):
+        for node in self.nodes:
+            try:
+                response = node.post({"jsonrpc": "2.0", "id": 0, "method": "eth_blockNumber", "params": []})
+                node.block_number = int(response["result"], 16)
+                node.failures = 0
+            except Exception:
+                node.block_number = None
+                node.failures = self.max_failures
+        best_block = max([node.block_number for node in self.nodes if node.block_number is not None], default=None)
+        for node in self.nodes:
+            node.healthy = (node.block_number is not None and
+                            best_block - node.block_number <= self.max_block_lag)
+
+    # 寫入節點順序：健康的主節點優先，其次為其他健康的節點
+    # 主節點被標記為不健康時跳過（避免每次寫入都先等到逾時），只有沒有其他健康節點時才退回主節點
+    def write_nodes(self):
+        primary = [node for node in self.nodes if node.role == "primary"]
+        others = [node for node in self.nodes if node.role != "primary" and node.healthy]
+        healthy_primary = [node for node in primary if node.healthy]
+        if healthy_primary:
+            return healthy_primary + others
+        return others + primary if others else primary
+
+    # 讀取節點順序：健康節點依延遲由低到高，不健康的節點放在最後作為備援
+    def read_nodes(self):
+        healthy = sorted([node for node in self.nodes if node.healthy],
+                         key=lambda node: node.latency if node.latency is not None else 0.0)
+        return healthy + [node for node in self.nodes if not node.healthy]
+
+    # 目前延遲最低的讀取節點網址（供直接發送 HTTP 請求的元件使用）
+    @property
+    def endpoint_uri(self):
+        return self.read_nodes()[0].url
+
+    # 依序嘗試節點直到成功，失敗的節點累計錯誤次數
+    # 指定區塊高度的讀取可能分配到尚未同步到該區塊的節點，此時改問下一個節點（不計為節點錯誤）
+    def _send(self, nodes: list, payload):
+        self.start()
+        last_error = None
+        last_response = None
+        for node in nodes:
+            try:
+                response = node.post(payload)
+                node.failures = 0
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as exc:
+                last_error = exc
+                node.failures += 1
+                if node.failures >= self.max_failures:
+                    node.healthy = False
+                continue
+            if not is_unknown_block(response):
+                return response
+            last_response = response
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+    # web3 provider 介面
+    def make_request(self, method, params):
+        payload = {"jsonrpc": "2.0", "id": next(self.request_counter), "method": method, "params": params}
+        nodes = self.write_nodes() if method in PRIMARY_METHODS else self.read_nodes()
+        return self._send(nodes, payload)
+
+    # 送出 JSON-RPC batch：含有需主節點處理的 method 時整批送到主節點
+    def make_batch_request(self, payload: list):
+        if any(each["method"] in PRIMARY_METHODS for each in payload):
+            return self._send(self.write_nodes(), payload)
+        return self._send(self.read_nodes(), payload)
+
+    def isConnected(self):
+        return any(node.healthy for node in self.nodes)
+
+    # 取得各節點狀態
+    def stats(self):
+        return [node.to_dict() for node in self.nodes]
+
+
+# JSON-RPC 回應（單筆或 batch）是否含有節點尚未同步到該區塊的錯誤
+def is_unknown_block(response):
+    responses = response if isinstance(response, list) else [response]
+    for each in responses:
+        error = each.get("error") if isinstance(each, dict) else None
+        if isinstance(error, dict) and any(text in str(error.get("message", "")).lower()
+                                           for text in UNKNOWN_BLOCK_ERRORS):
+            return True
+    return False
@@ -0,0 +1,152 @@
+# Receipt tracker packages
+import time
+import threading
+from collections import OrderedDict
+from web3 import Web3
+
+
+class ReceiptTracker:
+
+    # 初始化 - 背景以 JSON-RPC batch 輪詢所有未確認交易的收據
+    def __init__(self, blockchain, poll_interval: float = 1.0, drop_timeout: float = 300.0,
+                 max_records: int = 10000):
+        self.blockchain = blockchain
+        self.poll_interval = poll_interval
+        self.drop_timeout = drop_timeout
+        self.max_records = max_records
+        self.records = OrderedDict()  # tx_hash -> 交易狀態
+        self.callbacks = dict()  # tx_hash -> on_mined(record)
+        self.holds = dict()  # tx_hash -> 等待中的呼叫端數量（這些紀錄不會被淘汰）
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    # 開始追蹤某筆交易；on_mined(record) 會在交易完成（上鏈成功、revert 或被丟棄）後於背景執行緒呼叫
+    def track(self, tx_hash: str, account_address: str = None, nonce: int = None,
+              contract_address: str = None, on_mined=None):
+        record = {"tx_hash": tx_hash, "status": "pending", "account_address": account_address,
+                  "nonce": nonce, "contract_address": contract_address, "block_number": None,
+                  "gas_used": None, "submitted_at": time.time(), "finished_at": None}
+        with self.lock:
+            self.records[tx_hash] = record
+            if on_mined is not None:
+                self.callbacks[tx_hash] = on_mined
+            self._evict()
+        self._ensure_started()
+        self.wakeup.set()
+        return dict(record)
+
+    # 取得某筆交易目前的狀態
+    def get(self, tx_hash: str):
+        with self.lock:
+            record = self.records.get(tx_hash)
+            return None if record is None else dict(record)
+
+    # 呼叫端等待中的交易：完成後仍保留紀錄，直到 release
+    def hold(self, tx_hashes: list):
+        with self.lock:
+            for tx_hash in tx_hashes:
+                self.holds[tx_hash] = self.holds.get(tx_hash, 0) + 1
+
+    def release(self, tx_hashes: list):
+        with self.lock:
+            for tx_hash in tx_hashes:
+                count = self.holds.get(tx_hash, 0) - 1
+                if count > 0:
+                    self.holds[tx_hash] = count
+                else:
+                    self.holds.pop(tx_hash, None)
+            self._evict()
+
+    # 取得未確認交易數量
+    def pending_count(self):
+        with self.lock:
+            return sum(1 for record in self.records.values() if record["status"] == "pending")
+
+    def _ensure_started(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    # 超過上限時先淘汰最舊、已完成且沒有呼叫端等待的紀錄
+    def _evict(self):
+        if len(self.records) <= self.max_records:
+            return
+        for tx_hash in [tx_hash for tx_hash, record in self.records.items()
+                        if record["status"] != "pending" and tx_hash not in self.holds]:
+            del self.records[tx_hash]
+            if len(self.records) <= self.max_records:
+                break
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+            try:
+                self.poll_once()
+            except Exception as exc:
+                print("Receipt tracker error:", exc)
+
+    # 執行一次輪詢
+    def poll_once(self):
+        with self.lock:
+            pending = [dict(record) for record in self.records.values() if record["status"] == "pending"]
+        if not pending:
+            return
+        payload = [{"jsonrpc": "2.0", "id": i, "method": "eth_getTransactionReceipt", "params": [record["tx_hash"]]}
+                   for i, record in enumerate(pending)]
+        responses = self.blockchain.batch_request(payload)
+        overdue = list()
+        for i, record in enumerate(pending):
+            receipt = responses.get(i, dict()).get("result")
+            if receipt:
+                self._finish(record["tx_hash"], receipt)
+            elif time.time() - record["submitted_at"] > self.drop_timeout:
+                overdue.append(record)
+        if overdue:
+            self._check_dropped(overdue)
+
+    # 收據已產生：記錄上鏈結果、歸還 nonce 狀態、清除該合約的唯讀快取
+    def _finish(self, tx_hash: str, receipt: dict):
+        with self.lock:
+            callback = self.callbacks.pop(tx_hash, None)
+            result = dict(self.records[tx_hash])
+        result["status"] = "mined" if int(receipt["status"], 16) == 1 else "reverted"
+        result["block_number"] = int(receipt["blockNumber"], 16)
+        result["gas_used"] = int(receipt["gasUsed"], 16)
+        if receipt.get("contractAddress"):
+            result["contract_address"] = Web3.toChecksumAddress(receipt["contractAddress"])
+        result["finished_at"] = time.time()
+        if result["account_address"] is not None and result["nonce"] is not None:
+            self.blockchain.nonce_manager.confirm(result["account_address"], result["nonce"])
+        if result["contract_address"]:
+            self.blockchain.invalidate(result["contract_address"])
+        self._publish(tx_hash, callback, result)
+
+    # 逾時仍無收據的交易：節點上也查不到時視為已被丟棄，並重新同步 nonce
+    def _check_dropped(self, records: list):
+        payload = [{"jsonrpc": "2.0", "id": i, "method": "eth_getTransactionByHash", "params": [record["tx_hash"]]}
+                   for i, record in enumerate(records)]
+        responses = self.blockchain.batch_request(payload)
+        for i, record in enumerate(records):
+            if responses.get(i, dict()).get("result"):
+                continue
+            tx_hash = record["tx_hash"]
+            with self.lock:
+                callback = self.callbacks.pop(tx_hash, None)
+                result = dict(self.records[tx_hash], status="dropped", finished_at=time.time())
+            if record["account_address"] is not None:
+                self.blockchain.nonce_manager.resync(record["account_address"])
+            self._publish(tx_hash, callback, result)
+
+    # 先呼叫 on_mined 再公開結果：查詢者看到最終狀態時，後續處理（例如寫回合約地址）已完成，
+    # 失敗原因記錄在 callback_error
+    def _publish(self, tx_hash: str, callback, result: dict):
+        if callback is not None:
+            try:
+                callback(dict(result))
+            except Exception as exc:
+                result["callback_error"] = str(exc)
+        with self.lock:
+            self.records[tx_hash].update(result)
@@ -0,0 +1,442 @@
+# Benchmark packages
+# 離線效能測試：以 eth-tester（py-evm）模擬節點、SQLite 取代 MySQL，產生 N 位學生 × M 堂課的資料
+# 量測各頁面的延遲百分位數、每個 request 的 RPC 次數、每種交易的 gas 與吞吐量，結果輸出為 JSON 供不同版本比較
+#
+# 安裝：pip install -r requirements.txt "web3[tester]"
+# 執行：python test/benchmark.py --students 50 --courses 5 --output bench.json [--baseline old.json]
+import os
+import re
+import sys
+import json
+import time
+import random
+import sqlite3
+import platform
+import tempfile
+import argparse
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import yaml
+from eth_account import Account
+from web3 import Web3, HTTPProvider
+from web3.providers.eth_tester import EthereumTesterProvider
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 與 Metrics.server_timing 的格式對應
+SERVER_TIMING_PATTERN = re.compile(r'chain;dur=[\d.]+;desc="(\d+) calls, (\d+) rpc", db;dur=[\d.]+;desc="(\d+) queries"')
+
+# 頁面上顯示的交易 hash
+TX_HASH_PATTERN = re.compile(r"Hash: (0x[0-9a-fA-F]{64})")
+
+SCHEMA = [
+    "CREATE TABLE School (id TEXT PRIMARY KEY, password TEXT NOT NULL, name TEXT NOT NULL)",
+    "CREATE TABLE Student (id TEXT PRIMARY KEY, password TEXT NOT NULL, name TEXT NOT NULL, "
+    "address TEXT NOT NULL, contract_address TEXT NULL)",
+    "CREATE INDEX StudentAddress ON Student (address)",
+]
+
+
+# 將 eth-tester 回傳的 Python 值轉為 JSON-RPC 的格式（整數為 hex quantity、bytes 為 hex data）
+def to_wire(value):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, int):
+        return hex(value)
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    if isinstance(value, dict) or hasattr(value, "items"):
+        return {key: to_wire(each) for key, each in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_wire(each) for each in value]
+    return value
+
+
+class EthereumTesterServer:
+
+    # 初始化 - 以 HTTP JSON-RPC 包裝 EthereumTesterProvider（自動出塊）
+    # 讓 HTTPProvider、JSON-RPC batch 與 aiohttp 走與正式節點相同的路徑，RPC 次數才有意義
+    def __init__(self):
+        self.provider = EthereumTesterProvider()
+        self.make_request = self.provider.request_func(Web3(self.provider), [])
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if isinstance(payload, list):
+                    response = [server.handle(each) for each in payload]
+                else:
+                    response = server.handle(payload)
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+
+    # 已有餘額的測試帳戶私鑰
+    def get_funded_key(self, index: int = 0):
+        return self.provider.ethereum_tester.backend.account_keys[index].to_hex()
+
+    # 處理單一 JSON-RPC 請求（eth-tester 非 thread-safe，一次只處理一筆）
+    def handle(self, request: dict):
+        method, params = request["method"], request.get("params", [])
+        try:
+            with self.lock:
+                chain = getattr(self.provider.ethereum_tester.backend, "chain", None)
+                if method == "eth_chainId" and getattr(chain, "chain_id", None):
+                    # 以模擬鏈實際的 chain id 回應，簽署交易時才會與鏈一致
+                    response = {"result": chain.chain_id}
+                else:
+                    response = self.make_request(method, params)
+        except Exception as exc:
+            response = {"error": {"code": -32000, "message": str(exc)}}
+        return dict(to_wire(dict(response)), jsonrpc="2.0", id=request.get("id"))
+
+
+class SqliteCursor:
+
+    # 初始化 - 將 MySQL 的 %s 參數改為 SQLite 的 ?
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, args=None):
+        return self.cursor.execute(query.replace("%s", "?"), tuple(args or ()))
+
+    def executemany(self, query, args):
+        return self.cursor.executemany(query.replace("%s", "?"), [tuple(each) for each in args])
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class SqliteConnection:
+
+    # 初始化 - 提供 ConnectionPool 需要的 cursor / commit / rollback / close
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self):
+        return SqliteCursor(self.connection.cursor())
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.connection.close()
+
+
+# 以最近排名法取百分位數
+def percentile(sorted_values: list, p: float):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+# 彙整一組數值（平均、百分位數、最大值）
+def summarize(values: list):
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+    return {"count": len(ordered), "mean": sum(ordered) / len(ordered), "p50": percentile(ordered, 50),
+            "p90": percentile(ordered, 90), "p95": percentile(ordered, 95), "p99": percentile(ordered, 99),
+            "max": ordered[-1]}
+
+
+class Recorder:
+
+    # 初始化 - 記錄每個頁面 / 操作的延遲、RPC 次數、SQL 次數與錯誤數
+    def __init__(self):
+        self.samples = dict()
+
+    # 送出一次 request，延遲包含讀完整個 body（串流頁面才會量到完整輸出）
+    def request(self, name: str, send, check=None):
+        start = time.perf_counter()
+        response = send()
+        body = response.get_data(as_text=True)
+        elapsed = time.perf_counter() - start
+        sample = self.samples.setdefault(name, {"latency": [], "rpc_calls": [], "chain_calls": [],
+                                                "db_queries": [], "errors": 0, "wall": [start, start]})
+        sample["latency"].append(elapsed)
+        sample["wall"][1] = start + elapsed
+        match = SERVER_TIMING_PATTERN.search(response.headers.get("Server-Timing", ""))
+        if match:
+            sample["chain_calls"].append(int(match.group(1)))
+            sample["rpc_calls"].append(int(match.group(2)))
+            sample["db_queries"].append(int(match.group(3)))
+        if response.status_code >= 400 or (check is not None and not check(body)):
+            sample["errors"] += 1
+        return response, body
+
+    # 直接呼叫（非 HTTP）的操作，RPC 次數由 Blockchain 的 thread-local 計數取得
+    def call(self, name: str, blockchain, fn):
+        rpc_before = blockchain.get_thread_rpc_count()
+        start = time.perf_counter()
+        try:
+            result = fn()
+            failed = False
+        except Exception:
+            result, failed = None, True
+        elapsed = time.perf_counter() - start
+        sample = self.samples.setdefault(name, {"latency": [], "rpc_calls": [], "chain_calls": [],
+                                                "db_queries": [], "errors": 0, "wall": [start, start]})
+        sample["latency"].append(elapsed)
+        sample["wall"][1] = start + elapsed
+        sample["rpc_calls"].append(blockchain.get_thread_rpc_count() - rpc_before)
+        sample["errors"] += int(failed)
+        return result
+
+    def report(self):
+        results = dict()
+        for name, sample in self.samples.items():
+            wall = sample["wall"][1] - sample["wall"][0]
+            results[name] = {
+                "requests": len(sample["latency"]),
+                "errors": sample["errors"],
+                "throughput_per_second": len(sample["latency"]) / wall if wall > 0 else None,
+                "latency_seconds": summarize(sample["latency"]),
+                "rpc_calls_per_request": summarize(sample["rpc_calls"]),
+                "chain_calls_per_request": summarize(sample["chain_calls"]),
+                "db_queries_per_request": summarize(sample["db_queries"]),
+            }
+        return results
+
+
+# 取得區塊範圍內每筆交易的 gas 用量
+def get_gas_used(w3, first_block: int, last_block: int):
+    gas_list = list()
+    for block_number in range(first_block, last_block + 1):
+        for tx_hash in w3.eth.getBlock(block_number)["transactions"]:
+            gas_list.append(w3.eth.getTransactionReceipt(tx_hash)["gasUsed"])
+    return gas_list
+
+
+# 等待條件成立（背景 receipt tracker 寫回資料庫等）；failure() 回傳錯誤訊息時立即中止
+def wait_until(condition, timeout: float = 120.0, interval: float = 0.1, failure=None):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        message = failure() if failure is not None else None
+        if message:
+            raise RuntimeError("Benchmark failed: " + message)
+        if time.monotonic() >= deadline:
+            raise TimeoutError("Benchmark timed out waiting for transactions")
+        time.sleep(interval)
+
+
+def get_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+# 與先前的結果比較 p50 / p95 延遲與平均 RPC 次數（比值 > 1 表示變慢）
+def compare(results: dict, baseline: dict):
+    comparison = dict()
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", dict()).get(name)
+        if not previous:
+            continue
+        ratios = dict()
+        for metric, key in (("latency_seconds", "p50"), ("latency_seconds", "p95"), ("rpc_calls_per_request", "mean")):
+            before, after = previous[metric].get(key), current[metric].get(key)
+            if before and after is not None:
+                ratios[metric + "." + key] = after / before
+        comparison[name] = ratios
+    return comparison
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    node = EthereumTesterServer().start()
+    workdir = tempfile.mkdtemp(prefix="certificate-bench-")
+    db_path = os.path.join(workdir, "bench.sqlite3")
+
+    # 節點與資料庫設定（backend 於 import 時讀取）
+    with open(os.path.join(workdir, "blockchain.yml"), "w") as stream:
+        yaml.safe_dump({"nodes": [{"url": node.url, "role": "primary"}], "health_check_interval": 0}, stream)
+    with open(os.path.join(workdir, "database.yml"), "w") as stream:
+        yaml.safe_dump({"host": "", "database": db_path, "username": "", "password": "", "pool_size": 8}, stream)
+    os.environ["BLOCKCHAIN_CONFIG"] = os.path.join(workdir, "blockchain.yml")
+    os.environ["DATABASE_CONFIG"] = os.path.join(workdir, "database.yml")
+    # 以 Flask test client 量測，不啟動 async_server
+    os.environ["ASYNC_SERVER_PORT"] = "0"
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import backend
+
+    # 索引器需要 MySQL，頁面改走鏈上查詢
+    backend.indexer.stop()
+    backend.mysql_pool.connect = lambda: SqliteConnection(db_path)
+    backend.app.secret_key = "benchmark"
+    blockchain = backend.blockchain
+    w3 = Web3(HTTPProvider(node.url))
+
+    # 產生 N 位學生的資料（只需要地址，部署合約由學校帳戶付 gas）
+    school_key = node.get_funded_key(0)
+    students = [("S%06d" % index, Account.create().address) for index in range(args.students)]
+    connection = sqlite3.connect(db_path)
+    for command in SCHEMA:
+        connection.execute(command)
+    connection.execute("INSERT INTO School VALUES (?, ?, ?)", ("school", "password", "Benchmark University"))
+    connection.executemany("INSERT INTO Student VALUES (?, ?, ?, ?, NULL)",
+                           [(student_id, "password", "Student " + student_id, address)
+                            for student_id, address in students])
+    connection.commit()
+
+    def deployed_count():
+        return connection.execute("SELECT COUNT(*) FROM Student WHERE contract_address IS NOT NULL").fetchone()[0]
+
+    client = backend.app.test_client()
+    headers = {"X-Profile": "1"}
+    recorder = Recorder()
+    gas = dict()
+    confirm_seconds = dict()
+    submitted = lambda body: "Hash: 0x" in body
+
+    def login(key: str, value: str):
+        with client.session_transaction() as sess:
+            sess[key] = value
+
+    # 部署合約：每位學生一次 POST /school/new/，合約地址由 receipt tracker 於背景寫回
+    # enroll_year 為合約的 uint8（民國年）
+    login("school_id", "school")
+    first_block = w3.eth.blockNumber + 1
+    start = time.perf_counter()
+    deploy_hashes = list()
+    for student_id, address in students:
+        _, body = recorder.request("deploy_contract", lambda: client.post("/school/new/", headers=headers, data={
+            "school_private_key": school_key, "student_address": address, "student_name": "Student " + student_id,
+            "major": "Computer Science", "minor": "Mathematics", "enroll_year": "110"}), submitted)
+        deploy_hashes.extend(TX_HASH_PATTERN.findall(body))
+
+    # 送出失敗、交易失敗或合約地址寫回失敗時不必等到逾時
+    def deploy_failure():
+        errors = recorder.samples["deploy_contract"]["errors"]
+        if errors:
+            return "%d deploy requests failed" % errors
+        for tx_hash in deploy_hashes:
+            record = blockchain.get_transaction_status(tx_hash)
+            if record is not None and (record["status"] in ("reverted", "dropped") or record.get("callback_error")):
+                return "deploy %s %s %s" % (tx_hash, record["status"], record.get("callback_error") or "")
+        return None
+    wait_until(lambda: deployed_count() == len(students), failure=deploy_failure)
+    confirm_seconds["deploy_contract"] = time.perf_counter() - start
+    gas["deploy_contract"] = summarize(get_gas_used(w3, first_block, w3.eth.blockNumber))
+
+    # 上傳課程：每位學生 M 次 POST /school/upload/（每堂課一筆交易）
+    first_block = w3.eth.blockNumber + 1
+    start = time.perf_counter()
+    for student_id, _ in students:
+        for index in range(args.courses):
+            recorder.request("set_course", lambda: client.post("/school/upload/", headers=headers, data={
+                "school_private_key": school_key, "student_id": student_id, "course_name": "Course %d" % index,
+                "course_content": "x" * rng.randint(10, 200), "course_comment": "Benchmark",
+                "course_grade": str(rng.randint(0, 100))}), submitted)
+    wait_until(lambda: blockchain.receipt_tracker.pending_count() == 0)
+    confirm_seconds["set_course"] = time.perf_counter() - start
+    gas["set_course"] = summarize(get_gas_used(w3, first_block, w3.eth.blockNumber))
+
+    # 批次上傳課程（合約支援 setCourses 時）：每位學生一次，M 堂課合併成一筆交易
+    contract_addresses = dict(connection.execute("SELECT id, contract_address FROM Student").fetchall())
+    if blockchain.supports_batch_courses():
+        first_block = w3.eth.blockNumber + 1
+        start = time.perf_counter()
+        for student_id, _ in students:
+            # set_courses 接受 (name, content, comment, grade) tuple
+            courses = [("Batch %d" % index, "x" * rng.randint(10, 200), "Benchmark", rng.randint(0, 100))
+                       for index in range(args.courses)]
+            recorder.call("set_courses", blockchain,
+                          lambda: blockchain.set_courses(school_key, contract_addresses[student_id], courses))
+        wait_until(lambda: blockchain.receipt_tracker.pending_count() == 0)
+        confirm_seconds["set_courses"] = time.perf_counter() - start
+        gas["set_courses"] = summarize(get_gas_used(w3, first_block, w3.eth.blockNumber))
+
+    # 學生查看修課紀錄：第一次（快取未命中）與同一區塊內再次查看
+    for name in ("student_course", "student_course_repeat"):
+        for student_id, _ in students:
+            login("student_id", student_id)
+            recorder.request(name, lambda: client.get("/student/course/", headers=headers))
+
+    # 學校查看學生列表：依 keyset 分頁翻完整個名單（含鏈上課程數與學籍狀態）
+    for name, query in (("school_view", "?limit=%d" % args.page_size),
+                        ("school_view_enriched", "?limit=%d&enrich=1" % args.page_size)):
+        login("school_id", "school")
+        url = "/school/view/" + query
+        while url:
+            _, body = recorder.request(name, lambda: client.get(url, headers=headers))
+            match = re.search(r'href="(/school/view/\?[^"]*after=[^"]*)"', body)
+            url = match.group(1).replace("&amp;", "&") if match else None
+
+    # 公開驗證 API：單一合約與一次查詢整個名單
+    for student_id, _ in students:
+        recorder.request("verify", lambda: client.get("/verify/%s/" % contract_addresses[student_id],
+                                                      headers=headers))
+    recorder.request("verify_batch", lambda: client.post("/verify/", headers=headers,
+                                                         json={"addresses": list(contract_addresses.values())}))
+
+    results = {
+        "revision": get_revision(),
+        "python": platform.python_version(),
+        "params": {"students": args.students, "courses": args.courses, "page_size": args.page_size,
+                   "seed": args.seed},
+        "endpoints": recorder.report(),
+        "gas": gas,
+        "confirm_seconds": confirm_seconds,
+        "rpc_counts": blockchain.rpc_stats()["rpc_counts"],
+        "caches": blockchain.cache_stats(),
+    }
+    backend.async_blockchain.close()
+    node.stop()
+    connection.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the certificate backend")
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--courses", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results to this JSON file (default: stdout)")
+    parser.add_argument("--baseline", help="Previous results to compare against")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.baseline:
+        with open(args.baseline, "r") as stream:
+            results["comparison"] = compare(results, json.load(stream))
+    output = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as stream:
+            stream.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
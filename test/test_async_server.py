@@ -0,0 +1,155 @@
+# AsyncServer tests
+import asyncio
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+from async_server import (MAX_VERIFY_ADDRESSES, AsyncServer, check_verify_addresses,  # noqa: E402
+                          etag_matches, get_verify_etag)
+
+
+ADDRESS = "0x0000000000000000000000000000000000000001"
+TX_HASH = "0x" + "ab" * 32
+
+
+class StubBlockchain:
+
+    # 模擬 Blockchain 的交易狀態查詢：依序回傳 statuses 中的狀態
+    def __init__(self, statuses=(), callback_error=None):
+        self.statuses = list(statuses)
+        self.callback_error = callback_error
+
+    def get_transaction_status(self, tx_hash):
+        if tx_hash != TX_HASH or not self.statuses:
+            return None
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        record = {"tx_hash": tx_hash, "status": status}
+        if status != "pending" and self.callback_error:
+            record["callback_error"] = self.callback_error
+        return record
+
+
+class StubAsyncBlockchain:
+
+    # 模擬 AsyncBlockchain：記錄查詢的區塊與同時進行中的查詢數
+    def __init__(self, block_number: int = 7, delay: float = 0.0, blockchain=None):
+        self.blockchain = blockchain if blockchain is not None else StubBlockchain()
+        self.block_number = block_number
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.calls = list()
+
+    async def get_block_number(self):
+        return self.block_number
+
+    async def get_transcripts(self, contract_addresses, block_number=None):
+        self.calls.append((list(contract_addresses), block_number))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return [{"contract_address": address} for address in contract_addresses]
+
+
+def run_client(async_blockchain, scenario):
+    async def main():
+        server = AsyncServer(async_blockchain)
+        async with TestClient(TestServer(server.app)) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+def test_check_verify_addresses():
+    assert check_verify_addresses([]) == "缺少合約地址!"
+    assert check_verify_addresses("0x01") == "缺少合約地址!"
+    assert check_verify_addresses([ADDRESS, 1]) == "合約地址格式錯誤!"
+    assert check_verify_addresses([ADDRESS] * (MAX_VERIFY_ADDRESSES + 1)).startswith("一次最多查詢")
+    assert check_verify_addresses([ADDRESS]) is None
+
+
+def test_etag_matches():
+    etag = get_verify_etag(7, [ADDRESS])
+    assert etag_matches('"%s"' % etag, etag)
+    assert etag_matches('W/"other", W/"%s"' % etag, etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_verify_reads_transcripts_at_the_etag_block():
+    stub = StubAsyncBlockchain(block_number=42)
+
+    async def scenario(client):
+        response = await client.get("/verify/" + ADDRESS + "/")
+        return response.status, response.headers, await response.json()
+    status, headers, body = run_client(stub, scenario)
+    assert status == 200
+    assert body == {"contract_address": ADDRESS, "block_number": 42}
+    assert stub.calls == [([ADDRESS], 42)]
+    assert headers["ETag"] == '"%s"' % get_verify_etag(42, [ADDRESS])
+    assert headers["Access-Control-Allow-Origin"] == "*"
+
+
+def test_verify_returns_304_for_matching_etag():
+    stub = StubAsyncBlockchain(block_number=42)
+    etag = get_verify_etag(42, [ADDRESS, ADDRESS])
+
+    async def scenario(client):
+        response = await client.get("/verify/", params=[("address", ADDRESS), ("address", ADDRESS)],
+                                    headers={"If-None-Match": '"%s"' % etag})
+        return response.status
+    assert run_client(stub, scenario) == 304
+    assert stub.calls == []
+
+
+def test_verify_rejects_malformed_post_bodies():
+    async def scenario(client):
+        statuses = list()
+        for body in ([ADDRESS], {"addresses": [ADDRESS, None]}, {"addresses": "x"}):
+            response = await client.post("/verify/", json=body)
+            statuses.append(response.status)
+        response = await client.post("/verify/", data="not json")
+        statuses.append(response.status)
+        return statuses
+    assert run_client(StubAsyncBlockchain(), scenario) == [400, 400, 400, 400]
+
+
+def test_concurrent_requests_share_one_event_loop():
+    stub = StubAsyncBlockchain(delay=0.2)
+
+    async def scenario(client):
+        responses = await asyncio.gather(*[client.post("/verify/", json={"addresses": [ADDRESS]})
+                                           for _ in range(20)])
+        return [response.status for response in responses]
+    assert run_client(stub, scenario) == [200] * 20
+    # 等待節點回應時不佔用執行緒，20 個 request 同時進行
+    assert stub.max_active == 20
+
+
+def test_transaction_status_includes_callback_error():
+    stub = StubAsyncBlockchain(blockchain=StubBlockchain(["mined"], callback_error="儲存合約地址失敗!"))
+
+    async def scenario(client):
+        found = await client.get("/tx/" + TX_HASH + "/")
+        missing = await client.get("/tx/0x00/")
+        return found.status, await found.json(), missing.status
+    status, body, missing_status = run_client(stub, scenario)
+    assert status == 200
+    assert body["callback_error"] == "儲存合約地址失敗!"
+    assert missing_status == 404
+
+
+def test_transaction_status_stream_ends_when_finished():
+    stub = StubAsyncBlockchain(blockchain=StubBlockchain(["pending", "pending", "mined"]))
+
+    async def scenario(client):
+        response = await client.get("/tx/" + TX_HASH + "/stream/")
+        return response.headers, await response.text()
+    headers, text = run_client(stub, scenario)
+    assert headers["Content-Type"] == "text/event-stream"
+    assert headers["Access-Control-Allow-Origin"] == "*"
+    events = [chunk for chunk in text.split("\n\n") if chunk]
+    assert events == ['data: {"tx_hash": "%s", "status": "pending"}' % TX_HASH, ": keep-alive",
+                      'data: {"tx_hash": "%s", "status": "mined"}' % TX_HASH]
@@ -0,0 +1,77 @@
+# Blockchain batched read tests
+import pytest
+
+pytest.importorskip("web3")
+
+from web3 import Web3  # noqa: E402
+from blockchain import Blockchain  # noqa: E402
+
+
+FIRST = Web3.toChecksumAddress("0x00000000000000000000000000000000000000c1")
+SECOND = Web3.toChecksumAddress("0x00000000000000000000000000000000000000c2")
+BROKEN = Web3.toChecksumAddress("0x00000000000000000000000000000000000000c3")
+
+
+class StubChain:
+
+    # 模擬 Blockchain 的 batch_call：依 (合約, 函數, 參數) 查表，查不到時以 exception 物件回傳
+    def __init__(self, block_number: int = 9):
+        self.block_number = block_number
+        self.state = dict()
+        self.batches = list()
+
+    plan_transcripts = staticmethod(Blockchain.plan_transcripts)
+
+    def get_block_number(self):
+        return self.block_number
+
+    def batch_call(self, calls, raise_errors=True, block_number=None):
+        self.batches.append((list(calls), block_number))
+        results = list()
+        for contract_address, fn_name, args in calls:
+            key = (contract_address.lower(), fn_name, tuple(args))
+            results.append(self.state[key] if key in self.state else ValueError("execution reverted"))
+        return results
+
+    def set_contract(self, contract_address: str, **values):
+        for fn_name, value in values.items():
+            self.state[(contract_address.lower(), fn_name, ())] = value
+
+
+def test_get_contract_summaries_reports_errors_per_contract():
+    chain = StubChain()
+    chain.set_contract(FIRST, getCourseCount=3, getEducationStatus="learing")
+    chain.set_contract(BROKEN, getCourseCount=1)
+    summaries = Blockchain.get_contract_summaries(chain, [FIRST, BROKEN, "0x12"])
+    assert summaries == {FIRST: (3, "learing", None), BROKEN: (None, None, "execution reverted"),
+                         "0x12": (None, None, "Invalid address")}
+    # 所有合約的查詢合併在同一個 batch
+    assert len(chain.batches) == 1 and len(chain.batches[0][0]) == 4
+
+
+def test_get_transcripts_reads_every_batch_at_one_block():
+    chain = StubChain(block_number=9)
+    chain.set_contract(FIRST, profile=("Alice", FIRST, "NTUT", "CS", "Math", 110),
+                       getEducationStatus="learing", checkFinishCertificate=False, getCourseCount=1)
+    chain.state[(FIRST.lower(), "getCourse", (0, ))] = ("Math", "Algebra", "ok", 90)
+    chain.set_contract(SECOND, profile=("Bob", SECOND, "NTUT", "EE", "", 110),
+                       getEducationStatus="learing", checkFinishCertificate=False, getCourseCount=0)
+    chain.set_contract(BROKEN, profile=("Carol", BROKEN, "NTUT", "CS", "", 110))
+    transcripts = Blockchain.get_transcripts(chain, [FIRST.lower(), "0x12", SECOND, BROKEN])
+    # 依輸入順序回傳，無效地址與查詢失敗的合約只記錄 error
+    assert [transcript["contract_address"] for transcript in transcripts] == [FIRST, "0x12", SECOND, BROKEN]
+    assert transcripts[0]["courses"] == [{"name": "Math", "content": "Algebra", "comment": "ok", "grade": 90}]
+    assert transcripts[0]["profile"]["enroll_year"] == 110
+    assert transcripts[1] == {"contract_address": "0x12", "error": "Invalid address"}
+    assert transcripts[2]["courses"] == []
+    assert transcripts[3]["error"] == "execution reverted"
+    assert [block_number for _, block_number in chain.batches] == [9, 9]
+
+
+def test_get_transcripts_uses_the_given_block():
+    chain = StubChain(block_number=9)
+    chain.set_contract(SECOND, profile=("Bob", SECOND, "NTUT", "EE", "", 110),
+                       getEducationStatus="graduate", checkFinishCertificate=True, getCourseCount=0)
+    transcript, = Blockchain.get_transcripts(chain, [SECOND], block_number=7)
+    assert transcript["education_status"] == "graduate" and transcript["eligible_to_graduate"] is True
+    assert [block_number for _, block_number in chain.batches] == [7, 7]
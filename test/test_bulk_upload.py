@@ -0,0 +1,73 @@
+# Bulk upload tests
+import io
+import threading
+import pytest
+from bulk_upload import parse_records, BulkJob, JobRegistry, ROSTER_FIELDS
+
+
+def test_parse_csv_records():
+    stream = io.BytesIO("student_id,course_name,content,comment,grade,extra\n"
+                        "S1,Math,Calculus,good,90,x\n".encode("utf-8-sig"))
+    assert list(parse_records(stream, "courses.csv")) == [
+        {"student_id": "S1", "course_name": "Math", "content": "Calculus", "comment": "good", "grade": "90"}]
+
+
+def test_parse_jsonl_records():
+    stream = io.BytesIO(b'{"student_address": "0x1", "student_name": "A", "major": "CS", '
+                        b'"minor": "EE", "enroll_year": 2020}\n\n')
+    rows = list(parse_records(stream, "roster.jsonl", ROSTER_FIELDS))
+    assert rows == [{"student_address": "0x1", "student_name": "A", "major": "CS", "minor": "EE",
+                     "enroll_year": 2020}]
+
+
+def test_parse_records_rejects_missing_fields():
+    stream = io.BytesIO(b"student_id,course_name,content,comment,grade\nS1,Math,,good,90\n")
+    with pytest.raises(ValueError, match="content"):
+        list(parse_records(stream, "courses.csv"))
+
+
+def test_rows_are_sent_in_order_from_one_thread():
+    calls = list()
+
+    def handler(row, on_mined):
+        calls.append((row["row"], threading.get_ident()))
+        if row["row"] == 2:
+            raise ValueError("bad grade")
+        return "0x%02x" % row["row"]
+
+    job = BulkJob([{"value": i} for i in range(6)])
+    job.rows[4]["status"] = "failed"
+    JobRegistry()._run_rows(job, handler)
+    assert [index for index, _ in calls] == [0, 1, 2, 3, 5]
+    assert len({thread for _, thread in calls}) == 1
+    counts = job.to_dict(include_rows=False)["counts"]
+    assert counts == {"submitted": 4, "failed": 2}
+    assert job.rows[2]["error"] == "bad grade"
+
+
+def test_row_status_follows_the_receipt():
+    receipts = dict()
+
+    def handler(row, on_mined):
+        tx_hash = "0x%02x" % row["row"]
+        receipts[tx_hash] = on_mined
+        # 第一列的收據在 handler 回傳之前就已經回來
+        if row["row"] == 0:
+            on_mined({"tx_hash": tx_hash, "status": "mined"})
+        return tx_hash
+
+    job = BulkJob([{"value": i} for i in range(3)])
+    JobRegistry()._run_rows(job, handler)
+    receipts["0x01"]({"tx_hash": "0x01", "status": "reverted"})
+    assert [row["status"] for row in job.rows] == ["mined", "reverted", "submitted"]
+
+
+def test_failed_rows_are_handed_out_once():
+    job = BulkJob([{"student_address": "0x%02x" % i} for i in range(3)])
+    job.update_row(0, status="failed", error="nonce too low")
+    job.update_row(1, status="timeout", tx_hash="0x01", error="Receipt timeout")
+    assert job.failed_rows(("student_address", )) == [{"student_address": "0x00"}]
+    assert job.failed_rows(("student_address", )) == []
+    # 逾時的列保留 tx_hash，不會被當成失敗列重新部署
+    assert [row["tx_hash"] for row in job.rows_with_status("timeout")] == ["0x01"]
+    assert job.rows[0]["status"] == "retried"
@@ -0,0 +1,64 @@
+# LRUCache tests
+from cache import LRUCache
+
+
+def test_get_returns_default_when_missing():
+    cache = LRUCache(2)
+    assert cache.get("missing") is None
+    assert cache.get("missing", 0) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2
+
+
+def test_falsy_values_are_cached():
+    cache = LRUCache(2)
+    cache.put("zero", 0)
+    cache.put("false", False)
+    assert cache.get("zero", "missing") == 0
+    assert cache.get("false", "missing") is False
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(4, ttl=5.0)
+    cache.put("a", 1)
+    now[0] += 4.9
+    assert cache.get("a") == 1
+    now[0] += 0.2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_pop_and_pop_matching():
+    cache = LRUCache(8)
+    for block_number in range(3):
+        cache.put((block_number, "0xA"), block_number)
+        cache.put((block_number, "0xB"), block_number)
+    assert cache.pop((0, "0xA")) == 0
+    assert cache.pop((0, "0xA"), "gone") == "gone"
+    assert cache.pop_matching(lambda key, value: key[1] == "0xA") == 2
+    assert sorted(key for key in cache.data) == [(0, "0xB"), (1, "0xB"), (2, "0xB")]
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_stats_counts_hits_and_misses():
+    cache = LRUCache(4)
+    assert cache.stats()["hit_rate"] == 0.0
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"], stats["maxsize"]) == (2, 1, 1, 4)
+    assert abs(stats["hit_rate"] - 2 / 3) < 1e-9
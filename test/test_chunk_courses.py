@@ -0,0 +1,42 @@
+# Blockchain.chunk_courses tests
+import pytest
+
+pytest.importorskip("web3")
+
+from blockchain import TX_BASE_GAS, Blockchain  # noqa: E402
+
+
+def make_courses(count: int, content_length: int = 50):
+    return [("Course %d" % index, "x" * content_length, "ok", 80) for index in range(count)]
+
+
+def test_chunks_stay_under_gas_limit_and_keep_order():
+    courses = make_courses(40, content_length=300)
+    gas_limit = TX_BASE_GAS + 5 * Blockchain.estimate_course_gas(*courses[0])
+    chunks = Blockchain.chunk_courses(courses, gas_limit)
+    assert [course for chunk in chunks for course in chunk] == courses
+    assert [len(chunk) for chunk in chunks] == [5] * 8
+    for chunk in chunks:
+        assert TX_BASE_GAS + sum(Blockchain.estimate_course_gas(*course) for course in chunk) <= gas_limit
+
+
+def test_everything_fits_in_one_chunk():
+    courses = make_courses(3)
+    assert Blockchain.chunk_courses(courses, 10 ** 9) == [courses]
+
+
+def test_oversized_course_gets_its_own_chunk():
+    courses = make_courses(1) + [("Huge", "x" * 10000, "ok", 90)] + make_courses(1)
+    gas_limit = TX_BASE_GAS + Blockchain.estimate_course_gas(*courses[0]) * 2
+    chunks = Blockchain.chunk_courses(courses, gas_limit)
+    assert [len(chunk) for chunk in chunks] == [1, 1, 1]
+
+
+def test_empty_course_list():
+    assert Blockchain.chunk_courses([], 1000000) == []
+
+
+def test_longer_strings_cost_more_gas():
+    short = Blockchain.estimate_course_gas("Math", "x" * 10, "ok", 90)
+    longer = Blockchain.estimate_course_gas("Math", "x" * 100, "ok", 90)
+    assert longer > short
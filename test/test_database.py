@@ -0,0 +1,108 @@
+# StudentDirectory tests
+import sqlite3
+import pytest
+
+pytest.importorskip("pymysql")
+
+from database import ConnectionPool, StudentDirectory  # noqa: E402
+
+
+ADDRESS = "0x00000000000000000000000000000000000000Aa"
+OTHER_ADDRESS = "0x00000000000000000000000000000000000000Bb"
+CONTRACT = "0x00000000000000000000000000000000000000c0"
+
+
+class SqliteCursor:
+
+    # 初始化 - 將 MySQL 的 %s 參數改為 SQLite 的 ?，並記錄查詢
+    def __init__(self, cursor, queries):
+        self.cursor = cursor
+        self.queries = queries
+
+    def execute(self, query, args=None):
+        self.queries.append(query)
+        return self.cursor.execute(query.replace("%s", "?"), tuple(args or ()))
+
+    def executemany(self, query, args):
+        self.queries.append(query)
+        return self.cursor.executemany(query.replace("%s", "?"), [tuple(each) for each in args])
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class SqliteConnection:
+
+    def __init__(self, connection, queries):
+        self.connection = connection
+        self.queries = queries
+
+    def cursor(self):
+        return SqliteCursor(self.connection.cursor(), self.queries)
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def directory():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE Student (id TEXT PRIMARY KEY, password TEXT NOT NULL, name TEXT NOT NULL, "
+                       "address TEXT NOT NULL, contract_address TEXT NULL)")
+    connection.executemany("INSERT INTO Student VALUES (?, ?, ?, ?, ?)", [
+        ("S001", "pw", "Alice", ADDRESS, None),
+        ("S002", "pw", "Bob", OTHER_ADDRESS, CONTRACT),
+        ("S003", "pw", "Carol", "0x" + "0" * 39 + "3", None),
+    ])
+    connection.commit()
+    queries = list()
+    pool = ConnectionPool(dict(), size=1, connect=lambda: SqliteConnection(connection, queries))
+    directory = StudentDirectory(pool)
+    directory.queries = queries
+    return directory
+
+
+def test_get_student_is_cached(directory):
+    assert directory.get_name_and_address("S002") == ("Bob", OTHER_ADDRESS)
+    assert directory.get_contract_address("S002") == CONTRACT
+    assert len(directory.queries) == 1
+
+
+def test_get_contract_addresses_queries_only_missing_students(directory):
+    directory.get_student("S001")
+    directory.queries.clear()
+    assert directory.get_contract_addresses(["S001", "S002", "S003"]) == \
+        {"S001": None, "S002": CONTRACT, "S003": None}
+    assert len(directory.queries) == 1 and "IN (%s, %s)" in directory.queries[0]
+    directory.get_contract_addresses(["S002", "S003"])
+    assert len(directory.queries) == 1
+
+
+def test_store_contract_addresses_invalidates_any_address_case(directory):
+    directory.get_student("S001")
+    # 以不同大小寫的地址寫回（MySQL 比對時不分大小寫），快取仍需失效
+    assert directory.store_contract_addresses([(ADDRESS.lower(), CONTRACT)]) is True
+    assert directory.student_cache.get("S001") is None
+
+
+def test_stored_contract_address_is_read_back(directory):
+    assert directory.get_contract_address("S001") is None
+    assert directory.store_contract_address(ADDRESS, CONTRACT) is True
+    assert directory.get_contract_address("S001") == CONTRACT
+
+
+def test_list_students_pages_by_id(directory):
+    students, has_more = directory.list_students(limit=2)
+    assert [student[0] for student in students] == ["S001", "S002"] and has_more
+    students, has_more = directory.list_students(after_id="S002", limit=2)
+    assert [student[0] for student in students] == ["S003"] and not has_more
+    students, _ = directory.list_students(contract_status="deployed")
+    assert [student[0] for student in students] == ["S002"]
+    students, _ = directory.list_students(contract_status="none", name="aro")
+    assert [student[0] for student in students] == ["S003"]
@@ -0,0 +1,139 @@
+# EventIndexer tests
+import os
+import json
+import pytest
+
+pytest.importorskip("web3")
+
+from hexbytes import HexBytes  # noqa: E402
+from web3 import Web3  # noqa: E402
+from indexer import DONE_SET_COURSE, EventIndexer  # noqa: E402
+
+
+CERTIFICATE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "build", "contracts", "Certificate.json")
+CONTRACT = Web3.toChecksumAddress("0x00000000000000000000000000000000000000c0")
+PROXY = Web3.toChecksumAddress("0x00000000000000000000000000000000000000aa")
+
+
+class StubEth:
+
+    def __init__(self, logs):
+        self.logs = logs
+        self.blockNumber = 10
+
+    def getLogs(self, filter_params):
+        return [log for log in self.logs
+                if filter_params["fromBlock"] <= log["blockNumber"] <= filter_params["toBlock"]]
+
+    def getBlock(self, block_number):
+        return {"hash": HexBytes(block_number.to_bytes(32, "big"))}
+
+
+class StubW3:
+
+    def __init__(self, logs):
+        self.eth = StubEth(logs)
+
+
+class StubBlockchain:
+
+    # 模擬 Blockchain：transactions 為節點上的交易內容，check_finish 為合約 checkFinishCertificate 的回傳值
+    def __init__(self, logs, transactions, check_finish):
+        self.w3 = StubW3(logs)
+        self.contract_factory = Web3().eth.contract(abi=json.load(open(CERTIFICATE_FILE))["abi"])
+        self.transactions = transactions
+        self.check_finish = check_finish
+        self.calls = list()
+
+    def batch_request(self, payload):
+        return {request["id"]: {"result": self.transactions.get(request["params"][0])} for request in payload}
+
+    def batch_call(self, calls, raise_errors=True, block_number=None):
+        self.calls.append((calls, block_number))
+        return [self.check_finish[contract_address] for contract_address, _, _ in calls]
+
+
+class StubCursor:
+
+    def __init__(self, statements):
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, command, args=None):
+        self.statements.append((command, [args]))
+
+    def executemany(self, command, args):
+        self.statements.append((command, list(args)))
+
+
+class StubConnection:
+
+    def __init__(self):
+        self.statements = list()
+        self.commits = 0
+
+    def cursor(self):
+        return StubCursor(self.statements)
+
+    def commit(self):
+        self.commits += 1
+
+    # 寫入某資料表的所有資料列
+    def rows(self, table):
+        return [row for command, args in self.statements if " " + table + " " in command
+                and not command.startswith("DELETE") for row in args]
+
+
+def done_log(tx_hash: str, log_index: int, block_number: int, event_code: int):
+    data = Web3().codec.encode_abi(["uint8", "string"], [event_code, "Set Course"])
+    return {"address": CONTRACT, "blockNumber": block_number, "blockHash": HexBytes(b"\x01" * 32),
+            "transactionHash": HexBytes(tx_hash), "transactionIndex": 0, "logIndex": log_index,
+            "topics": [Web3.keccak(text="done(uint8,string)")], "data": "0x" + data.hex()}
+
+
+def set_course_tx(blockchain, to: str, course: tuple):
+    return {"to": to.lower(), "input": blockchain.contract_factory.encodeABI(fn_name="setCourse", args=list(course))}
+
+
+def make_indexer(transactions_to: str):
+    tx_hash = "0x" + "11" * 32
+    blockchain = StubBlockchain([done_log(tx_hash, 0, 5, DONE_SET_COURSE)], dict(), {CONTRACT: True})
+    blockchain.transactions[tx_hash] = set_course_tx(blockchain, transactions_to, ("Math", "Algebra", "ok", 90))
+    return EventIndexer(blockchain, dict()), blockchain, tx_hash
+
+
+def test_direct_set_course_is_indexed_with_contract_eligibility():
+    indexer, blockchain, tx_hash = make_indexer(CONTRACT)
+    connection = StubConnection()
+    indexer._index_range(connection, 1, 10)
+    assert connection.rows("IndexedCourse") == [(CONTRACT, 5, tx_hash, 0, "Math", "Algebra", "ok", 90)]
+    # 畢業條件由合約在索引到的區塊回答，不在本地重算
+    assert blockchain.calls == [([(CONTRACT, "checkFinishCertificate", [])], 10)]
+    assert connection.rows("IndexedEligibility") == [(CONTRACT, 10, True)]
+    assert connection.rows("IndexerFallback") == []
+    assert connection.commits == 1
+
+
+def test_set_course_through_proxy_marks_contract_for_chain_reads():
+    indexer, blockchain, _ = make_indexer(PROXY)
+    connection = StubConnection()
+    indexer._index_range(connection, 1, 10)
+    assert connection.rows("IndexedCourse") == []
+    assert connection.rows("IndexerFallback") == [(CONTRACT, 5)]
+    assert blockchain.calls == []
+    # checkpoint 仍與 fallback 標記在同一個 transaction 內前進
+    assert connection.rows("IndexerBlock")[0][0] == 10
+
+
+def test_missing_transaction_marks_contract_for_chain_reads():
+    indexer, blockchain, _ = make_indexer(CONTRACT)
+    blockchain.transactions.clear()
+    connection = StubConnection()
+    indexer._index_range(connection, 1, 10)
+    assert connection.rows("IndexerFallback") == [(CONTRACT, 5)]
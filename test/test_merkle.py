@@ -0,0 +1,53 @@
+# Merkle tree tests
+import pytest
+
+pytest.importorskip("web3")
+pytest.importorskip("eth_abi")
+
+from merkle import MerkleTree, hash_record, verify_proof  # noqa: E402
+
+
+def make_record(index: int, **kwargs):
+    record = {"student_id": "S%03d" % index, "course_name": "Course %d" % index,
+              "content": "content", "comment": "comment", "grade": 60 + index}
+    record.update(kwargs)
+    return record
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 4, 5, 7, 8, 13])
+def test_every_record_has_a_valid_proof(size):
+    tree = MerkleTree([make_record(i) for i in range(size)])
+    assert len(tree) == size
+    for index in range(size):
+        assert verify_proof(tree.leaves[index], tree.get_proof(index), tree.root)
+
+
+def test_single_record_root_is_its_leaf():
+    tree = MerkleTree([make_record(0)])
+    assert tree.root == hash_record(make_record(0))
+    assert tree.get_proof(0) == []
+
+
+def test_tampered_record_does_not_verify():
+    records = [make_record(i) for i in range(5)]
+    tree = MerkleTree(records)
+    forged = hash_record(dict(records[2], grade=100))
+    assert not verify_proof(forged, tree.get_proof(2), tree.root)
+
+
+def test_proof_is_bound_to_its_position():
+    tree = MerkleTree([make_record(i) for i in range(4)])
+    assert not verify_proof(tree.leaves[1], tree.get_proof(2), tree.root)
+
+
+def test_adjacent_string_fields_do_not_collide():
+    first = make_record(0, student_id="12", course_name="3Math")
+    second = make_record(0, student_id="123", course_name="Math")
+    assert hash_record(first) != hash_record(second)
+    tree = MerkleTree([first, make_record(1)])
+    assert not verify_proof(hash_record(second), tree.get_proof(0), tree.root)
+
+
+def test_empty_batch_is_rejected():
+    with pytest.raises(ValueError):
+        MerkleTree([])
@@ -0,0 +1,52 @@
+# Metrics tests
+import pytest
+
+pytest.importorskip("flask")
+
+from metrics import Metrics, cache_samples  # noqa: E402
+
+
+def test_render_histogram_is_cumulative():
+    metrics = Metrics()
+    labels = {"component": "blockchain", "method": "get_courses"}
+    for value in (0.002, 0.02, 20.0):
+        metrics.observe("chain_call_duration_seconds", labels, value)
+    lines = metrics.render().splitlines()
+    assert "# HELP chain_call_duration_seconds Blockchain method latency" in lines
+    assert "# TYPE chain_call_duration_seconds histogram" in lines
+    prefix = 'chain_call_duration_seconds_bucket{component="blockchain",method="get_courses",'
+    assert prefix + 'le="0.001"} 0' in lines
+    assert prefix + 'le="0.005"} 1' in lines
+    assert prefix + 'le="0.025"} 2' in lines
+    assert prefix + 'le="10.0"} 2' in lines
+    assert prefix + 'le="+Inf"} 3' in lines
+    assert 'chain_call_duration_seconds_count{component="blockchain",method="get_courses"} 3' in lines
+    sum_line = [line for line in lines if line.startswith("chain_call_duration_seconds_sum{")][0]
+    assert abs(float(sum_line.split()[-1]) - 20.022) < 1e-9
+
+
+def test_render_counters_collectors_and_escaping():
+    metrics = Metrics()
+    metrics.inc("chain_call_errors_total", {"component": "blockchain", "method": "set_course"})
+    metrics.inc("chain_call_errors_total", {"component": "blockchain", "method": "set_course"})
+    metrics.add_collector(lambda: cache_samples({"view": {"hits": 3, "misses": 1, "hit_rate": 0.75, "size": 2}}))
+    metrics.add_collector(lambda: [("custom_gauge", "gauge", "", [({"path": 'a"b\\c'}, True)])])
+    text = metrics.render()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    assert "# TYPE chain_call_errors_total counter" in lines
+    assert 'chain_call_errors_total{component="blockchain",method="set_course"} 2' in lines
+    assert 'cache_hits_total{cache="view"} 3' in lines
+    assert 'cache_hit_ratio{cache="view"} 0.75' in lines
+    assert "# TYPE custom_gauge gauge" in lines
+    assert "# HELP custom_gauge" not in text
+    assert 'custom_gauge{path="a\\"b\\\\c"} 1' in lines
+
+
+def test_record_query_labels_operation_and_table():
+    metrics = Metrics()
+    metrics.record_query("update `Student` SET contract_address=%s WHERE id=%s", 0.01)
+    metrics.record_query("SELECT * FROM School WHERE id=%s", 0.01)
+    text = metrics.render()
+    assert 'db_query_duration_seconds_count{operation="UPDATE",table="Student"} 1' in text
+    assert 'db_query_duration_seconds_count{operation="SELECT",table="School"} 1' in text
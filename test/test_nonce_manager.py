@@ -0,0 +1,100 @@
+# NonceManager tests
+import threading
+from nonce_manager import NonceManager
+
+
+ADDRESS = "0x0000000000000000000000000000000000000001"
+
+
+class StubEth:
+
+    # 模擬節點的 latest / pending 交易數
+    def __init__(self, latest: int, pending: int):
+        self.latest = latest
+        self.pending = pending
+
+    def getTransactionCount(self, address, block_identifier):
+        return self.pending if block_identifier == "pending" else self.latest
+
+
+class StubWeb3:
+
+    def __init__(self, latest: int = 0, pending: int = 0):
+        self.eth = StubEth(latest, pending)
+
+
+def test_allocate_starts_from_pending_count():
+    manager = NonceManager(StubWeb3(latest=3, pending=5))
+    assert [manager.allocate(ADDRESS) for _ in range(3)] == [5, 6, 7]
+
+
+def test_resync_does_not_reissue_reserved_nonce():
+    w3 = StubWeb3(latest=5, pending=5)
+    manager = NonceManager(w3)
+    first = manager.allocate(ADDRESS)
+    second = manager.allocate(ADDRESS)
+    assert (first, second) == (5, 6)
+    # 第一筆送出失敗，第二筆仍在簽署中
+    manager.release(ADDRESS, first)
+    assert manager.resync(ADDRESS) == 7
+    assert [manager.allocate(ADDRESS), manager.allocate(ADDRESS)] == [5, 7]
+
+
+def test_resync_keeps_pending_nonces():
+    w3 = StubWeb3(latest=0, pending=0)
+    manager = NonceManager(w3)
+    for _ in range(3):
+        nonce = manager.allocate(ADDRESS)
+        manager.mark_sent(ADDRESS, nonce, "0x%02x" % nonce)
+    # 節點還沒看到在途交易時也不可回退
+    assert manager.resync(ADDRESS) == 3
+    assert manager.allocate(ADDRESS) == 3
+
+
+def test_resync_rewinds_when_nothing_in_flight():
+    w3 = StubWeb3(latest=0, pending=0)
+    manager = NonceManager(w3)
+    nonce = manager.allocate(ADDRESS)
+    manager.mark_sent(ADDRESS, nonce, "0x00")
+    dropped = manager.allocate(ADDRESS)
+    manager.release(ADDRESS, dropped)
+    w3.eth.latest = w3.eth.pending = 1
+    manager.confirm(ADDRESS, nonce)
+    assert manager.resync(ADDRESS) == 1
+    assert manager.allocate(ADDRESS) == 1
+
+
+def test_resync_drops_released_nonces_used_by_node():
+    w3 = StubWeb3(latest=0, pending=0)
+    manager = NonceManager(w3)
+    nonce = manager.allocate(ADDRESS)
+    manager.release(ADDRESS, nonce)
+    # 送出逾時但節點其實已收到
+    w3.eth.pending = 1
+    assert manager.resync(ADDRESS) == 1
+    assert manager.allocate(ADDRESS) == 1
+
+
+def test_concurrent_allocations_are_never_sent_twice():
+    manager = NonceManager(StubWeb3())
+    sent = list()
+    lock = threading.Lock()
+
+    # 部分交易送出失敗並 resync，其餘執行緒同時仍持有已分配的 nonce
+    def worker():
+        for _ in range(100):
+            nonce = manager.allocate(ADDRESS)
+            if nonce % 7 == 0:
+                manager.release(ADDRESS, nonce)
+                manager.resync(ADDRESS)
+                continue
+            with lock:
+                sent.append(nonce)
+            manager.mark_sent(ADDRESS, nonce, hex(nonce))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(sent) == len(set(sent))
@@ -0,0 +1,119 @@
+# ProviderPool routing tests
+import pytest
+
+pytest.importorskip("web3")
+requests = pytest.importorskip("requests")
+pytest.importorskip("yaml")
+
+from provider_pool import Node, ProviderPool, is_unknown_block  # noqa: E402
+
+
+class StubNode(Node):
+
+    # 模擬節點：依 responder 回傳結果，記錄收到的 method
+    def __init__(self, url, role="replica", latency=None, responder=None):
+        super().__init__(url, role)
+        self.latency = latency
+        self.responder = responder or (lambda payload: {"jsonrpc": "2.0", "id": 0, "result": url})
+        self.methods = list()
+
+    def post(self, payload):
+        self.methods.append(payload[0]["method"] if isinstance(payload, list) else payload["method"])
+        return self.responder(payload)
+
+
+def refuse(payload):
+    raise requests.ConnectionError("refused")
+
+
+def unknown_block(payload):
+    return {"jsonrpc": "2.0", "id": 0, "error": {"code": -32000, "message": "header not found"}}
+
+
+def make_pool(*nodes, **kwargs):
+    return ProviderPool(list(nodes), health_check_interval=0, **kwargs)
+
+
+def test_reads_go_to_lowest_latency_node():
+    primary = StubNode("primary", "primary", latency=0.5)
+    fast = StubNode("fast", latency=0.01)
+    slow = StubNode("slow", latency=0.2)
+    pool = make_pool(primary, fast, slow)
+    assert pool.make_request("eth_call", [])["result"] == "fast"
+    assert pool.endpoint_uri == "fast"
+
+
+def test_writes_go_to_primary():
+    primary = StubNode("primary", "primary", latency=0.5)
+    fast = StubNode("fast", latency=0.01)
+    pool = make_pool(primary, fast)
+    assert pool.make_request("eth_sendRawTransaction", ["0x"])["result"] == "primary"
+    batch = [{"jsonrpc": "2.0", "id": 1, "method": "eth_call", "params": []},
+             {"jsonrpc": "2.0", "id": 2, "method": "eth_getTransactionReceipt", "params": []}]
+    assert pool.make_batch_request(batch)["result"] == "primary"
+    assert fast.methods == []
+
+
+def test_writes_skip_unhealthy_primary():
+    primary = StubNode("primary", "primary", responder=refuse)
+    backup = StubNode("backup")
+    pool = make_pool(primary, backup, max_failures=1)
+    assert pool.make_request("eth_sendRawTransaction", ["0x"])["result"] == "backup"
+    assert not primary.healthy
+    assert pool.write_nodes() == [backup, primary]
+    pool.make_request("eth_getTransactionCount", [])
+    assert primary.methods == ["eth_sendRawTransaction"]
+
+
+def test_unhealthy_primary_is_used_when_no_other_node_is_healthy():
+    primary = StubNode("primary", "primary")
+    replica = StubNode("replica")
+    primary.healthy = replica.healthy = False
+    pool = make_pool(primary, replica)
+    assert pool.write_nodes() == [primary]
+
+
+def test_failover_on_connection_error_marks_node_unhealthy():
+    broken = StubNode("broken", latency=0.01, responder=refuse)
+    backup = StubNode("backup", latency=0.2)
+    pool = make_pool(broken, backup, max_failures=2)
+    for _ in range(2):
+        assert pool.make_request("eth_call", [])["result"] == "backup"
+    assert not broken.healthy
+    assert pool.read_nodes()[0] is backup
+
+
+def test_all_nodes_down_raises_last_error():
+    pool = make_pool(StubNode("a", responder=refuse), StubNode("b", responder=refuse))
+    with pytest.raises(requests.ConnectionError):
+        pool.make_request("eth_call", [])
+
+
+def test_pinned_read_retries_node_that_reached_the_block():
+    lagging = StubNode("lagging", latency=0.01, responder=unknown_block)
+    synced = StubNode("synced", latency=0.2)
+    pool = make_pool(lagging, synced)
+    assert pool.make_request("eth_call", [{}, "0x10"])["result"] == "synced"
+    assert lagging.failures == 0
+
+
+def test_unknown_block_everywhere_returns_the_error_response():
+    pool = make_pool(StubNode("a", responder=unknown_block), StubNode("b", responder=unknown_block))
+    assert is_unknown_block(pool.make_request("eth_call", [{}, "0x10"]))
+
+
+def test_is_unknown_block_checks_batch_entries():
+    assert is_unknown_block([{"id": 1, "result": "0x"}, unknown_block(None)])
+    assert not is_unknown_block([{"id": 1, "result": "0x"},
+                                 {"id": 2, "error": {"code": 3, "message": "execution reverted"}}])
+
+
+def test_lagging_replica_is_unhealthy_after_health_check():
+    def at_block(number):
+        return lambda payload: {"jsonrpc": "2.0", "id": 0, "result": hex(number)}
+    head = StubNode("head", responder=at_block(100))
+    lagging = StubNode("lagging", latency=0.01, responder=at_block(90))
+    pool = make_pool(head, lagging, max_block_lag=2)
+    pool.check_health()
+    assert head.healthy and not lagging.healthy
+    assert pool.read_nodes()[0] is head
@@ -0,0 +1,125 @@
+# ReceiptTracker tests
+import pytest
+
+pytest.importorskip("web3")
+
+from receipt_tracker import ReceiptTracker  # noqa: E402
+
+
+ACCOUNT = "0x0000000000000000000000000000000000000001"
+CONTRACT = "0x00000000000000000000000000000000000000c0"
+
+
+class StubNonceManager:
+
+    def __init__(self):
+        self.confirmed = list()
+        self.resynced = list()
+
+    def confirm(self, account_address, nonce):
+        self.confirmed.append((account_address, nonce))
+
+    def resync(self, account_address):
+        self.resynced.append(account_address)
+
+
+class StubBlockchain:
+
+    # 模擬 Blockchain：receipts / transactions 為節點上查得到的收據與交易
+    def __init__(self):
+        self.receipts = dict()
+        self.transactions = set()
+        self.nonce_manager = StubNonceManager()
+        self.invalidated = list()
+
+    def batch_request(self, payload):
+        responses = dict()
+        for request in payload:
+            tx_hash = request["params"][0]
+            if request["method"] == "eth_getTransactionReceipt":
+                result = self.receipts.get(tx_hash)
+            else:
+                result = {"hash": tx_hash} if tx_hash in self.transactions else None
+            responses[request["id"]] = {"result": result}
+        return responses
+
+    def invalidate(self, contract_address):
+        self.invalidated.append(contract_address)
+
+
+def receipt(status: int, contract_address: str = None):
+    return {"status": hex(status), "blockNumber": "0x10", "gasUsed": "0x5208",
+            "contractAddress": contract_address}
+
+
+def make_tracker(**kwargs):
+    tracker = ReceiptTracker(StubBlockchain(), **kwargs)
+    # 測試中由 poll_once 手動輪詢，不啟動背景執行緒
+    tracker._ensure_started = lambda: None
+    return tracker
+
+
+def test_mined_and_reverted_receipts():
+    tracker = make_tracker()
+    finished = list()
+    tracker.track("0x01", account_address=ACCOUNT, nonce=3, on_mined=finished.append)
+    tracker.track("0x02", contract_address=CONTRACT)
+    tracker.blockchain.receipts["0x01"] = receipt(1, CONTRACT)
+    tracker.blockchain.receipts["0x02"] = receipt(0)
+    tracker.poll_once()
+    mined, reverted = tracker.get("0x01"), tracker.get("0x02")
+    assert (mined["status"], mined["block_number"], mined["gas_used"]) == ("mined", 16, 21000)
+    assert mined["contract_address"] == CONTRACT
+    assert reverted["status"] == "reverted"
+    assert finished == [dict(mined)]
+    assert tracker.blockchain.nonce_manager.confirmed == [(ACCOUNT, 3)]
+    assert tracker.blockchain.invalidated == [CONTRACT, CONTRACT]
+    assert tracker.pending_count() == 0
+
+
+def test_missing_transaction_is_dropped_after_timeout():
+    tracker = make_tracker(drop_timeout=0.0)
+    finished = list()
+    tracker.track("0x01", account_address=ACCOUNT, nonce=0, on_mined=finished.append)
+    tracker.track("0x02", account_address=ACCOUNT, nonce=1)
+    # 0x02 仍在節點的 mempool 中，繼續等待
+    tracker.blockchain.transactions.add("0x02")
+    tracker.poll_once()
+    assert tracker.get("0x01")["status"] == "dropped"
+    assert tracker.get("0x02")["status"] == "pending"
+    assert [record["status"] for record in finished] == ["dropped"]
+    assert tracker.blockchain.nonce_manager.resynced == [ACCOUNT]
+
+
+def test_callback_runs_before_status_is_published():
+    tracker = make_tracker()
+    seen = list()
+
+    def on_mined(record):
+        # 後續處理進行中，查詢者仍看到 pending
+        seen.append(tracker.get("0x01")["status"])
+        raise RuntimeError("儲存合約地址失敗!")
+    tracker.track("0x01", on_mined=on_mined)
+    tracker.blockchain.receipts["0x01"] = receipt(1)
+    tracker.poll_once()
+    assert seen == ["pending"]
+    record = tracker.get("0x01")
+    assert record["status"] == "mined"
+    assert record["callback_error"] == "儲存合約地址失敗!"
+
+
+def test_held_records_are_not_evicted():
+    tracker = make_tracker(max_records=2)
+    for tx_hash in ("0x01", "0x02"):
+        tracker.track(tx_hash)
+        tracker.blockchain.receipts[tx_hash] = receipt(1)
+    tracker.hold(["0x01"])
+    tracker.poll_once()
+    tracker.track("0x03")
+    tracker.track("0x04")
+    # 0x02 已完成且沒有呼叫端等待，先被淘汰；pending 與 held 的紀錄保留
+    assert tracker.get("0x01")["status"] == "mined"
+    assert tracker.get("0x02") is None
+    tracker.release(["0x01"])
+    assert tracker.get("0x01") is None
+    assert tracker.get("0x03")["status"] == "pending"
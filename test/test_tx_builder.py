@@ -0,0 +1,117 @@
+# TransactionBuilder tests
+import pytest
+from tx_builder import GAS_PER_EXTRA_BYTE, TransactionBuilder
+
+
+SENDER = "0x0000000000000000000000000000000000000001"
+OTHER_SENDER = "0x0000000000000000000000000000000000000002"
+
+
+class StubFunction:
+
+    # 模擬 web3 的 ContractFunction / ContractConstructor
+    def __init__(self, fn_name, *args, gas: int = 100000, error: Exception = None):
+        self.fn_name = fn_name
+        self.args = args
+        self.gas = gas
+        self.error = error
+        self.estimates = 0
+
+    def estimateGas(self, transaction):
+        self.estimates += 1
+        if self.error is not None:
+            raise self.error
+        return self.gas
+
+
+class StubEth:
+
+    def __init__(self, gas_limit: int):
+        self.gas_limit = gas_limit
+        self.block_queries = 0
+
+    def getBlock(self, block_identifier):
+        self.block_queries += 1
+        return {"gasLimit": self.gas_limit}
+
+
+class StubWeb3:
+
+    def __init__(self, gas_limit: int):
+        self.eth = StubEth(gas_limit)
+
+
+class StubBlockchain:
+
+    def __init__(self, gas_limit: int = 10000000, block_number: int = 1):
+        self.w3 = StubWeb3(gas_limit)
+        self.block_number = block_number
+
+    def get_block_number(self):
+        return self.block_number
+
+
+def test_gas_key_groups_arguments_by_size_class():
+    builder = TransactionBuilder(StubBlockchain())
+    short = StubFunction("setCourse", "Math", "x" * 10, "ok", 90)
+    longer = StubFunction("setCourse", "Math", "x" * 20, "ok", 90)
+    assert builder.get_gas_key(short, SENDER) == builder.get_gas_key(longer, SENDER)
+    assert builder.get_gas_key(short, SENDER)[:3] == ("setCourse", SENDER, 4)
+    much_longer = StubFunction("setCourse", "Math", "x" * 500, "ok", 90)
+    assert builder.get_gas_key(much_longer, SENDER) != builder.get_gas_key(short, SENDER)
+
+
+def test_gas_key_counts_list_elements_and_names_constructor():
+    builder = TransactionBuilder(StubBlockchain())
+    batch = StubFunction("setCourses", ["a", "b"], ["c", "d"], ["e", "f"], [1, 2])
+    assert builder.get_gas_key(batch, SENDER)[2] == 8
+    constructor = StubFunction(None, "Alice", SENDER)
+    assert builder.get_gas_key(constructor, SENDER)[0] == "constructor"
+
+
+def test_get_size_counts_utf8_bytes():
+    assert TransactionBuilder.get_size(StubFunction("setName", "畢業")) == 6
+    assert TransactionBuilder.get_size(StubFunction("setCourse", 1, b"ab")) == 34
+
+
+def test_estimate_is_reused_with_extra_bytes():
+    builder = TransactionBuilder(StubBlockchain(), gas_margin=1.0)
+    first = StubFunction("setCourse", "Math", "x" * 40, "ok", 90)
+    second = StubFunction("setCourse", "Math", "x" * 45, "ok", 90)
+    assert builder.estimate_gas(first, SENDER) == 100000
+    assert builder.estimate_gas(second, SENDER) == 100000 + 5 * GAS_PER_EXTRA_BYTE
+    assert (first.estimates, second.estimates) == (1, 0)
+
+
+def test_other_sender_is_estimated_separately():
+    builder = TransactionBuilder(StubBlockchain())
+    builder.estimate_gas(StubFunction("setCertificate"), SENDER)
+    # 另一位學生尚未滿足畢業門檻，estimateGas 會 revert，不能沿用前一位學生的估算
+    not_finished = StubFunction("setCertificate", error=ValueError("Not yet finish"))
+    with pytest.raises(ValueError):
+        builder.estimate_gas(not_finished, OTHER_SENDER)
+    assert not_finished.estimates == 1
+
+
+def test_reverted_transaction_drops_the_estimate():
+    builder = TransactionBuilder(StubBlockchain())
+    function = StubFunction("setCourse", "Math", "x", "ok", 90)
+    builder.estimate_gas(function, SENDER)
+    builder.invalidate_gas(function, SENDER)
+    builder.estimate_gas(function, SENDER)
+    assert function.estimates == 2
+
+
+def test_estimate_is_capped_at_block_gas_limit(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("tx_builder.time.monotonic", lambda: now[0])
+    blockchain = StubBlockchain(gas_limit=1000000)
+    builder = TransactionBuilder(blockchain, gas_margin=1.25, gas_limit_ttl=60.0)
+    assert builder.estimate_gas(StubFunction("setCourses", gas=900000), SENDER) == 1000000
+    # 區塊前進時沿用同一個 gas 上限，不會每筆交易多一次 eth_getBlockByNumber
+    blockchain.block_number += 1
+    builder.estimate_gas(StubFunction("setCourses", gas=900000), SENDER)
+    assert blockchain.w3.eth.block_queries == 1
+    now[0] += 60.0
+    builder.estimate_gas(StubFunction("setCourses", gas=900000), SENDER)
+    assert blockchain.w3.eth.block_queries == 2
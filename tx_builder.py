@@ -0,0 +1,108 @@
+# Transaction builder packages
+import time
+import threading
+from cache import LRUCache
+
+
+# 同一大小級距內，參數每多 1 byte 預留的 gas（storage 寫入約 625 gas/byte，加上 calldata）
+GAS_PER_EXTRA_BYTE = 700
+
+
+class TransactionBuilder:
+
+    # 初始化 - 快取 gas 估算（依函數、sender 與參數大小級距）、每個區塊的 gas price 與 chain id
+    # 區塊 gas 上限很少變動，gas_limit_ttl 秒內沿用同一個值
+    def __init__(self, blockchain, gas_margin: float = 1.25, cache_size: int = 256, gas_limit_ttl: float = 60.0):
+        self.blockchain = blockchain
+        self.gas_margin = gas_margin
+        self.gas_cache = LRUCache(cache_size)
+        self.lock = threading.Lock()
+        self.chain_id = None
+        self.gas_price = None
+        self.gas_price_block = None
+        self.gas_limit = None
+        self.gas_limit_ttl = gas_limit_ttl
+        self.gas_limit_checked_at = 0.0
+
+    # 以參數中字串 / bytes 的總長度計算大小級距（以 32 bytes 為單位取 2 的次方）
+    @staticmethod
+    def get_size(txn_function):
+        size = 0
+        for arg in getattr(txn_function, "args", None) or ():
+            values = arg if isinstance(arg, (list, tuple)) else (arg, )
+            for value in values:
+                if isinstance(value, str):
+                    size += len(value.encode("utf-8"))
+                elif isinstance(value, (bytes, bytearray)):
+                    size += len(value)
+                else:
+                    size += 32
+        return size
+
+    # 取得 gas 快取的 key：(函數名稱, sender, 參數數量, 大小級距)
+    # 合約的寫入函數以 require 檢查 sender（checkSchool / checkStudent），key 包含 sender，
+    # 換了一把私鑰（例如錯誤的學校私鑰）就會重新 estimateGas，在送出前發現會 revert 的交易
+    def get_gas_key(self, txn_function, from_address: str):
+        fn_name = getattr(txn_function, "fn_name", None) or "constructor"
+        args = getattr(txn_function, "args", None) or ()
+        arg_count = sum(len(arg) if isinstance(arg, (list, tuple)) else 1 for arg in args)
+        size_class = (self.get_size(txn_function) // 32).bit_length()
+        return (fn_name, from_address.lower(), arg_count, size_class)
+
+    # 估算 gas：同一級距已估算過時直接沿用並依大小差距加上預留量，否則向節點估算一次
+    # 加上預留量後不超過區塊 gas 上限
+    def estimate_gas(self, txn_function, from_address: str):
+        key = self.get_gas_key(txn_function, from_address)
+        size = self.get_size(txn_function)
+        cached = self.gas_cache.get(key)
+        if cached is None:
+            estimate = txn_function.estimateGas({'from': from_address})
+            cached = (estimate, size)
+            self.gas_cache.put(key, cached)
+        estimate, estimated_size = cached
+        gas = int((estimate + max(0, size - estimated_size) * GAS_PER_EXTRA_BYTE) * self.gas_margin)
+        return min(gas, self.get_gas_limit())
+
+    # 交易 revert 時移除該級距的估算：可能是沿用的估算不足，或合約狀態改變後 require 不再成立，
+    # 下一筆交易會重新 estimateGas，在送出前就發現會失敗
+    def invalidate_gas(self, txn_function, from_address: str):
+        self.gas_cache.pop(self.get_gas_key(txn_function, from_address))
+
+    # 取得 gas price，每個區塊只向節點查詢一次
+    def get_gas_price(self):
+        block_number = self.blockchain.get_block_number()
+        with self.lock:
+            if self.gas_price is None or self.gas_price_block != block_number:
+                self.gas_price = self.blockchain.w3.eth.gasPrice
+                self.gas_price_block = block_number
+            return self.gas_price
+
+    # 取得區塊 gas 上限（gas_limit_ttl 秒內沿用，不隨每個區塊重新查詢）
+    def get_gas_limit(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.gas_limit is None or now - self.gas_limit_checked_at >= self.gas_limit_ttl:
+                self.gas_limit = self.blockchain.w3.eth.getBlock("latest")["gasLimit"]
+                self.gas_limit_checked_at = now
+            return self.gas_limit
+
+    # 取得 chain id（只查詢一次）
+    def get_chain_id(self):
+        with self.lock:
+            if self.chain_id is None:
+                self.chain_id = self.blockchain.w3.eth.chainId
+            return self.chain_id
+
+    # 建立交易內容（gas、gasPrice、chainId 皆已填好，buildTransaction 不會再呼叫節點）
+    def build(self, txn_function, from_address: str, nonce: int):
+        return txn_function.buildTransaction({
+            'from': from_address,
+            'nonce': nonce,
+            'gas': self.estimate_gas(txn_function, from_address),
+            'gasPrice': self.get_gas_price(),
+            'chainId': self.get_chain_id(),
+        })
+
+    # 取得快取統計
+    def stats(self):
+        return {"gas": self.gas_cache.stats(), "gas_price_block": self.gas_price_block}